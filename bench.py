@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Weirdhost 离线性能基准
+- 启动本地模拟面板，依次运行 test.py / test1.py / test2.py
+- 统计总耗时、每个服务器平均耗时、浏览器内存峰值（RSS）
+- --buttons N：对比逐个元素查询与页面内一次扫描的按钮查找耗时
+
+用法: python bench.py --servers 5 --latency 100 --entry test1.py --repeat 3
+      python bench.py --buttons 500
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+from mock_panel import MockPanel
+from metrics import process_tree_rss
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ENTRY_POINTS = ['test.py', 'test1.py', 'test2.py']
+
+
+def run_entry(entry, panel, workdir, extra_env, timeout, sample_interval=0.2):
+    """运行一个入口脚本，返回计时和内存统计"""
+    server_urls = panel.server_urls()
+    env = dict(os.environ)
+    env.update({
+        'WEIRDHOST_URL': panel.url,
+        'WEIRDHOST_LOGIN_URL': f"{panel.url}/auth/login",
+        'WEIRDHOST_SERVER_URLS': ','.join(server_urls),
+        'REMEMBER_WEB_COOKIE': 'bench',
+        'WEIRDHOST_STATE_DIR': os.path.join(workdir, '.weirdhost'),
+        'WEIRDHOST_TIMING_FILE': os.path.join(workdir, 'timing_report.json'),
+        'PYTHONUNBUFFERED': '1',
+    })
+    env.update(extra_env)
+
+    log_path = os.path.join(workdir, f"{entry}.log")
+    peak_total = peak_browser = 0
+    start = time.perf_counter()
+
+    with open(log_path, 'w', encoding='utf-8') as log_file:
+        proc = subprocess.Popen(
+            [sys.executable, os.path.join(SCRIPT_DIR, entry)],
+            cwd=workdir, env=env, stdout=log_file, stderr=subprocess.STDOUT
+        )
+        while proc.poll() is None:
+            total, browser = process_tree_rss(proc.pid)
+            peak_total = max(peak_total, total)
+            peak_browser = max(peak_browser, browser)
+            if time.perf_counter() - start > timeout:
+                proc.kill()
+                break
+            time.sleep(sample_interval)
+        proc.wait()
+
+    wall = time.perf_counter() - start
+    result = {
+        'entry': entry,
+        'exit_code': proc.returncode,
+        'wall_seconds': round(wall, 3),
+        'per_server_seconds': round(wall / max(len(server_urls), 1), 3),
+        'peak_rss_mb': round(peak_total / 1024 / 1024, 1),
+        'peak_browser_rss_mb': round(peak_browser / 1024 / 1024, 1),
+        'log': log_path,
+    }
+
+    # test1.py 会写入计时报告，取出每个服务器的实际耗时
+    timing_file = env['WEIRDHOST_TIMING_FILE']
+    if os.path.exists(timing_file):
+        with open(timing_file, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        result['server_seconds'] = {sid: data['total'] for sid, data in report.get('servers', {}).items()}
+        os.remove(timing_file)
+
+    return result
+
+
+def legacy_button_scan(page, keywords):
+    """旧版按钮查找：逐个按钮查询可见性和文本，每次查询都是一次往返"""
+    buttons = page.locator('button')
+    for i in range(buttons.count()):
+        button = buttons.nth(i)
+        if button.is_visible():
+            text = button.text_content().strip()
+            if any(keyword in text for keyword in keywords):
+                return button
+    return None
+
+
+def bench_button_scan(panel, count, repeat):
+    """按钮扫描基准，返回两种方法的平均耗时"""
+    from playwright.sync_api import sync_playwright
+    from test1 import WeirdhostAuto
+
+    auto = WeirdhostAuto()
+    auto.log = lambda *args, **kwargs: None
+    keywords = ["시간", "Renew", "Add", "추가"]
+    timings = {'legacy': [], 'in_page': []}
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        page.goto(f"{panel.url}/bench/buttons?n={count}")
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+            assert legacy_button_scan(page, keywords) is not None
+            timings['legacy'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            assert auto.find_button_alternative_methods(page, 'bench', keywords) is not None
+            timings['in_page'].append(time.perf_counter() - start)
+
+        browser.close()
+
+    return {name: round(sum(values) / len(values), 4) for name, values in timings.items()}
+
+
+def print_table(results):
+    print(f"{'入口':<10} {'退出码':>6} {'总耗时(s)':>10} {'单服务器(s)':>12} {'峰值RSS(MB)':>12} {'浏览器RSS(MB)':>14}")
+    for r in results:
+        print(f"{r['entry']:<10} {r['exit_code']:>6} {r['wall_seconds']:>10} {r['per_server_seconds']:>12} "
+              f"{r['peak_rss_mb']:>12} {r['peak_browser_rss_mb']:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Weirdhost 离线性能基准')
+    parser.add_argument('--entry', action='append', choices=ENTRY_POINTS, help='要测试的入口，可重复，默认全部')
+    parser.add_argument('--servers', type=int, default=3, help='模拟服务器数量')
+    parser.add_argument('--latency', type=int, default=0, help='模拟面板每个请求的延迟（毫秒）')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='模拟面板接口失败概率')
+    parser.add_argument('--renew-cooldown', type=float, default=0.0, help='续期冷却时间（秒）')
+    parser.add_argument('--repeat', type=int, default=1, help='每个入口重复次数')
+    parser.add_argument('--timeout', type=int, default=1800, help='单次运行超时（秒）')
+    parser.add_argument('--env', action='append', default=[], help='传给入口脚本的额外环境变量 KEY=VALUE')
+    parser.add_argument('--buttons', type=int, help='只运行按钮扫描基准，指定页面按钮数量')
+    parser.add_argument('--json', help='把结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    if args.buttons:
+        with MockPanel([]) as panel:
+            averages = bench_button_scan(panel, args.buttons, args.repeat)
+        print(f"按钮数量: {args.buttons}, 重复 {args.repeat} 次")
+        print(f"  逐个元素查询: {averages['legacy']}s")
+        print(f"  页面内一次扫描: {averages['in_page']}s")
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump({'buttons': args.buttons, 'average_seconds': averages}, f, indent=2)
+        return
+
+    extra_env = dict(item.split('=', 1) for item in args.env)
+    server_ids = [f"bench{i:03d}" for i in range(args.servers)]
+    results = []
+
+    with MockPanel(server_ids, latency=args.latency, fail_rate=args.fail_rate,
+                   renew_cooldown=args.renew_cooldown) as panel:
+        print(f"🧪 模拟面板: {panel.url} ({args.servers} 个服务器, 延迟 {args.latency}ms)")
+        for entry in args.entry or ENTRY_POINTS:
+            for i in range(args.repeat):
+                workdir = tempfile.mkdtemp(prefix=f"bench_{entry.split('.')[0]}_")
+                result = run_entry(entry, panel, workdir, extra_env, args.timeout)
+                result['run'] = i + 1
+                results.append(result)
+                print(f"  {entry} #{i + 1}: {result['wall_seconds']}s (日志: {result['log']})")
+        counters = dict(panel.state.counters)
+
+    print()
+    print_table(results)
+    print(f"\n面板计数: {counters}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'results': results, 'panel': counters}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Weirdhost 常驻浏览器服务
+- 启动一次 Chromium 并开放本地 CDP 端口，续期脚本通过 CDP 连接，省去每次启动浏览器
+- 连接地址写入状态目录的 browser.json；服务不可用时各脚本自行启动浏览器
+
+用法: python browser_host.py --port 9222
+"""
+
+import os
+import json
+import signal
+import argparse
+import threading
+import urllib.request
+
+
+STATE_DIR = os.getenv('WEIRDHOST_STATE_DIR', '.weirdhost')
+ENDPOINT_FILE = os.path.join(STATE_DIR, 'browser.json')
+
+LAUNCH_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--no-sandbox',
+    '--disable-dev-shm-usage'
+]
+
+
+def find_browser_host(timeout=0.5):
+    """返回可用的常驻浏览器 CDP 地址，没有可用的服务时返回 None
+
+    WEIRDHOST_BROWSER_ENDPOINT 可直接指定地址，WEIRDHOST_BROWSER_HOST=false 关闭连接
+    """
+    if os.getenv('WEIRDHOST_BROWSER_HOST', 'true').lower() == 'false':
+        return None
+
+    endpoint = os.getenv('WEIRDHOST_BROWSER_ENDPOINT')
+    if not endpoint:
+        try:
+            with open(ENDPOINT_FILE, 'r', encoding='utf-8') as f:
+                endpoint = json.load(f).get('endpoint')
+        except (OSError, ValueError):
+            return None
+    if not endpoint:
+        return None
+
+    # 本地地址不走代理
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+    try:
+        with opener.open(f"{endpoint.rstrip('/')}/json/version", timeout=timeout) as response:
+            if response.status == 200:
+                return endpoint
+    except OSError:
+        pass
+    return None
+
+
+def connect_or_launch(p, headless=True, args=None, log=print):
+    """优先连接常驻浏览器，不可用时自行启动；返回 (browser, 常驻浏览器地址或 None)"""
+    endpoint = find_browser_host()
+    if endpoint:
+        try:
+            browser = p.chromium.connect_over_cdp(endpoint)
+            log(f"🔌 已连接常驻浏览器: {endpoint}")
+            return browser, endpoint
+        except Exception as e:
+            log(f"连接常驻浏览器失败，改为自行启动: {e}")
+
+    return p.chromium.launch(headless=headless, args=args or LAUNCH_ARGS), None
+
+
+def serve(port, headless=True):
+    """启动浏览器并保持运行，直到收到 SIGTERM/SIGINT 或浏览器退出"""
+    from playwright.sync_api import sync_playwright
+
+    endpoint = f"http://127.0.0.1:{port}"
+    stop_event = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda signum, frame: stop_event.set())
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(
+            headless=headless,
+            args=LAUNCH_ARGS + [f'--remote-debugging-port={port}', '--remote-debugging-address=127.0.0.1']
+        )
+
+        os.makedirs(STATE_DIR, exist_ok=True)
+        with open(ENDPOINT_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'endpoint': endpoint, 'pid': os.getpid()}, f)
+        print(f"🌐 常驻浏览器已启动: {endpoint} (Chromium {browser.version})", flush=True)
+
+        try:
+            while not stop_event.wait(5):
+                if not browser.is_connected():
+                    print("⚠️ 浏览器已退出", flush=True)
+                    break
+        finally:
+            try:
+                os.remove(ENDPOINT_FILE)
+            except OSError:
+                pass
+            if browser.is_connected():
+                browser.close()
+
+    print("常驻浏览器已停止", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Weirdhost 常驻浏览器服务')
+    parser.add_argument('--port', type=int, default=int(os.getenv('WEIRDHOST_BROWSER_PORT', '9222')), help='CDP 端口')
+    parser.add_argument('--headed', action='store_true', help='显示浏览器窗口')
+    args = parser.parse_args()
+
+    headless = not args.headed and os.getenv('HEADLESS', 'true').lower() == 'true'
+    serve(args.port, headless=headless)
+
+
+if __name__ == "__main__":
+    main()
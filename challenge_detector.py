@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CF 挑战页面检测
+- 一次页面内求值同时检查挑战页的元素、标题和文本，再结合导航响应的状态码和响应头判断
+- 检测到挑战时用 wait_for_function 等待挑战页自行消失，条件满足立即返回，不使用固定等待
+- 只是等待挑战完成，不尝试绕过挑战
+"""
+
+import time
+
+
+# 挑战页特有的元素
+CHALLENGE_SELECTORS = (
+    '#challenge-form',
+    '.challenge-form',
+    '#challenge-running',
+    '#challenge-stage',
+    '#cf-content',
+    '#cf-challenge-running',
+)
+
+# 挑战页的标题和正文提示，正文只在页面文本很短时才检查，避免正常页面中的字样误判
+CHALLENGE_TITLES = ('just a moment', 'attention required', 'checking your browser')
+CHALLENGE_TEXTS = ('checking your browser', 'verify you are human', 'security check')
+CHALLENGE_TEXT_MAX_LENGTH = 2000
+
+# 在页面中执行的检测函数，返回命中的特征，没有挑战时返回 null
+PROBE_FUNCTION = """
+([selectors, titles, texts, maxLength]) => {
+    const visible = el => !!el && !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    for (const selector of selectors) {
+        if (visible(document.querySelector(selector))) return 'selector ' + selector;
+    }
+    const title = (document.title || '').toLowerCase();
+    for (const text of titles) {
+        if (title.includes(text)) return 'title "' + text + '"';
+    }
+    const body = document.body ? (document.body.innerText || '') : '';
+    if (body.length <= maxLength) {
+        const lower = body.toLowerCase();
+        for (const text of texts) {
+            if (lower.includes(text)) return 'text "' + text + '"';
+        }
+    }
+    return null;
+}
+"""
+
+CLEARED_FUNCTION = f"args => !({PROBE_FUNCTION.strip()})(args)"
+
+PROBE_ARGS = [list(CHALLENGE_SELECTORS), list(CHALLENGE_TITLES), list(CHALLENGE_TEXTS), CHALLENGE_TEXT_MAX_LENGTH]
+
+
+def classify_response(response):
+    """根据导航响应判断是否为挑战页，返回特征描述，不是时返回 None"""
+    if response is None:
+        return None
+    headers = response.headers
+    if headers.get('cf-mitigated', '').lower() == 'challenge':
+        return f"cf-mitigated ({response.status})"
+    return None
+
+
+def is_cloudflare_block(response):
+    """403/503 且由 Cloudflare 返回，本身不一定是挑战页，只作为辅助信息"""
+    return (response is not None and response.status in (403, 503)
+            and response.headers.get('server', '').lower().startswith('cloudflare'))
+
+
+def detect_challenge(page, response=None):
+    """检测当前页面是否为挑战页：一次页面求值 + 导航响应，返回 (特征描述, 挑战页是否仍在显示)
+
+    没有挑战时特征描述为 None；只有响应头标记了挑战而页面特征未命中时，
+    说明挑战已在等待页面加载期间完成并跳转回原地址，挑战页不再显示
+    """
+    reason = page.evaluate(PROBE_FUNCTION, PROBE_ARGS)
+    active = reason is not None
+    header_reason = classify_response(response)
+    if header_reason:
+        return (f"{header_reason}, {reason}" if reason else header_reason), active
+    if reason and is_cloudflare_block(response):
+        return f"{reason}, {response.status} cloudflare", active
+    return reason, active
+
+
+def wait_for_clear(page, timeout):
+    """等待挑战页消失，返回是否在 timeout 秒内完成
+
+    挑战通过后页面会跳转，等待中遇到跳转导致的执行上下文销毁时，等新页面加载后继续检查
+    """
+    from playwright.sync_api import Error, TimeoutError
+
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = (deadline - time.monotonic()) * 1000
+        if remaining <= 0:
+            return False
+        try:
+            page.wait_for_function(CLEARED_FUNCTION, arg=PROBE_ARGS, timeout=remaining)
+            return True
+        except TimeoutError:
+            return False
+        except Error:
+            # 挑战完成后的跳转销毁了执行上下文，等新页面加载后重新检查
+            try:
+                page.wait_for_load_state('domcontentloaded', timeout=max(1, (deadline - time.monotonic()) * 1000))
+            except TimeoutError:
+                return False
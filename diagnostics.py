@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可选的诊断记录：每个服务器一段 Playwright trace 和/或 HAR
+- WEIRDHOST_DIAGNOSTICS=trace,har 开启，默认关闭
+- 只保留失败服务器的记录，成功的记录直接丢弃
+- 诊断目录总大小受 WEIRDHOST_DIAGNOSTICS_MAX_MB 限制，HAR 中的响应体截断到 WEIRDHOST_HAR_BODY_BYTES
+"""
+
+import os
+import json
+import threading
+from datetime import datetime, timezone
+
+
+# HAR 中只记录这些类型请求的响应体，静态资源只记录时间和头
+BODY_RESOURCE_TYPES = ('document', 'xhr', 'fetch')
+
+
+def directory_size(path):
+    """统计目录下文件总大小"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def har_timings(timing):
+    """把 Playwright 的 request.timing 转换为 HAR timings（毫秒，-1 表示不适用）"""
+    def span(start, end):
+        if timing.get(start, -1) < 0 or timing.get(end, -1) < 0:
+            return -1
+        return round(timing[end] - timing[start], 3)
+
+    ssl = span('secureConnectionStart', 'connectEnd')
+    return {
+        'blocked': -1,
+        'dns': span('domainLookupStart', 'domainLookupEnd'),
+        'connect': span('connectStart', 'connectEnd'),
+        'ssl': ssl,
+        'send': 0,
+        'wait': span('requestStart', 'responseStart'),
+        'receive': span('responseStart', 'responseEnd'),
+    }
+
+
+def header_list(headers):
+    return [{'name': name, 'value': value} for name, value in (headers or {}).items()]
+
+
+class Diagnostics:
+    """诊断配置和磁盘预算，多个浏览器上下文（线程）共用"""
+
+    def __init__(self, modes=None, directory=None, max_mb=None, body_bytes=None, log=print):
+        modes = os.getenv('WEIRDHOST_DIAGNOSTICS', '') if modes is None else modes
+        self.modes = {m.strip().lower() for m in modes.split(',') if m.strip()}
+        self.directory = directory or os.getenv('WEIRDHOST_DIAGNOSTICS_DIR', 'diagnostics')
+        self.max_bytes = int(float(max_mb or os.getenv('WEIRDHOST_DIAGNOSTICS_MAX_MB', '50')) * 1024 * 1024)
+        self.body_bytes = int(body_bytes or os.getenv('WEIRDHOST_HAR_BODY_BYTES', '4096'))
+        self.log = log
+
+        self._used = None
+        self._full_logged = False
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.modes & {'trace', 'har'})
+
+    def attach(self, context):
+        """为浏览器上下文创建记录器，未开启诊断时返回 None"""
+        if not self.enabled:
+            return None
+        return ContextRecorder(self, context)
+
+    def file_path(self, server_id, suffix):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        return os.path.join(self.directory, f"{server_id}_{stamp}{suffix}")
+
+    def reserve(self, size):
+        """占用 size 字节的磁盘预算，超出上限返回 False"""
+        with self._lock:
+            if self._used is None:
+                self._used = directory_size(self.directory)
+            if self._used + size > self.max_bytes:
+                if not self._full_logged:
+                    self.log(f"诊断目录已达上限 {self.max_bytes // 1024 // 1024}MB，不再保存新的记录")
+                    self._full_logged = True
+                return False
+            self._used += size
+            return True
+
+
+class ContextRecorder:
+    """单个浏览器上下文的记录器，按服务器分段：begin() 开始，end() 结束并决定是否保存"""
+
+    def __init__(self, diagnostics, context):
+        self.diagnostics = diagnostics
+        self.context = context
+        self.trace = 'trace' in diagnostics.modes
+        self.har = 'har' in diagnostics.modes
+        self.server_id = None
+        self._requests = []
+
+        if self.trace:
+            context.tracing.start(screenshots=False, snapshots=True)
+        if self.har:
+            # 成功的服务器不需要响应体，这里只保存请求对象，失败时才读取
+            context.on('requestfinished', self._requests.append)
+            context.on('requestfailed', self._requests.append)
+
+    def begin(self, server_id):
+        self.server_id = server_id
+        self._requests.clear()
+        if self.trace:
+            self.context.tracing.start_chunk(title=server_id)
+
+    def end(self, failed):
+        """结束当前服务器的记录：失败时保存，成功时丢弃"""
+        server_id, self.server_id = self.server_id, None
+        if server_id is None:
+            return
+
+        try:
+            if self.trace:
+                self._end_trace(server_id, failed)
+            if self.har and failed:
+                self._save_har(server_id)
+        except Exception as e:
+            self.diagnostics.log(f"保存诊断记录失败: {e}")
+        finally:
+            self._requests.clear()
+
+    def _end_trace(self, server_id, failed):
+        if not failed:
+            self.context.tracing.stop_chunk()
+            return
+
+        path = self.diagnostics.file_path(server_id, '.trace.zip')
+        self.context.tracing.stop_chunk(path=path)
+        size = os.path.getsize(path)
+        if self.diagnostics.reserve(size):
+            self.diagnostics.log(f"🧾 已保存 trace: {path} ({size // 1024}KB)")
+        else:
+            os.remove(path)
+
+    def _save_har(self, server_id):
+        entries = [self._har_entry(request) for request in list(self._requests)]
+        har = {
+            'log': {
+                'version': '1.2',
+                'creator': {'name': 'weirdhost-diagnostics', 'version': '1.0'},
+                'pages': [],
+                'entries': entries,
+            }
+        }
+        data = json.dumps(har, ensure_ascii=False).encode('utf-8')
+        if not self.diagnostics.reserve(len(data)):
+            return
+
+        path = self.diagnostics.file_path(server_id, '.har')
+        with open(path, 'wb') as f:
+            f.write(data)
+        self.diagnostics.log(f"🧾 已保存 HAR: {path} ({len(entries)} 个请求, {len(data) // 1024}KB)")
+
+    def _har_entry(self, request):
+        timing = request.timing or {}
+        timings = har_timings(timing)
+        started = datetime.fromtimestamp(timing.get('startTime', 0) / 1000, timezone.utc)
+        total = timing.get('responseEnd', -1)
+
+        entry = {
+            'startedDateTime': started.isoformat(),
+            'time': round(total, 3) if total >= 0 else 0,
+            'request': {
+                'method': request.method,
+                'url': request.url,
+                'httpVersion': 'HTTP/1.1',
+                'headers': header_list(request.headers),
+                'queryString': [],
+                'cookies': [],
+                'headersSize': -1,
+                'bodySize': len(request.post_data_buffer or b''),
+            },
+            'response': {
+                'status': 0,
+                'statusText': request.failure or '',
+                'httpVersion': 'HTTP/1.1',
+                'headers': [],
+                'cookies': [],
+                'content': {'size': 0, 'mimeType': ''},
+                'redirectURL': '',
+                'headersSize': -1,
+                'bodySize': -1,
+            },
+            'cache': {},
+            'timings': timings,
+            '_resourceType': request.resource_type,
+        }
+
+        response = request.response() if request.failure is None else None
+        if response is not None:
+            headers = response.headers
+            content = {'size': -1, 'mimeType': headers.get('content-type', '')}
+            if request.resource_type in BODY_RESOURCE_TYPES:
+                content.update(self._truncated_body(response))
+            entry['response'].update({
+                'status': response.status,
+                'statusText': response.status_text,
+                'headers': header_list(headers),
+                'content': content,
+                'redirectURL': headers.get('location', ''),
+            })
+
+        return entry
+
+    def _truncated_body(self, response):
+        """读取响应体并截断；页面跳转后响应体可能已被浏览器回收"""
+        try:
+            body = response.body()
+        except Exception:
+            return {'comment': 'body unavailable'}
+
+        limit = self.diagnostics.body_bytes
+        result = {'size': len(body), 'text': body[:limit].decode('utf-8', errors='replace')}
+        if len(body) > limit:
+            result['comment'] = f"truncated to {limit} of {len(body)} bytes"
+        return result
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行指标导出
+- 阶段耗时直方图、各状态计数、服务器到期时间、浏览器内存
+- 运行结束时写入 node_exporter textfile，常驻模式下也可通过 HTTP 提供
+- 默认输出 Prometheus 文本格式（node_exporter textfile 只接受该格式），也可输出 OpenMetrics
+"""
+
+import os
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# 导出直方图的阶段，对应 test1.py 中的计时阶段
+HISTOGRAM_PHASES = (
+    'login', 'navigate', 'cf_challenge', 'page_ready', 'find_button', 'verify',
+    'renew', 'start', 'http_renew', 'http_start', 'browser_launch', 'browser_connect',
+)
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+# ---------- 进程内存 ----------
+
+def read_rss_bytes(pid):
+    """读取进程的常驻内存（字节），进程已退出时返回 0"""
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def child_pids(pid):
+    """递归获取所有子进程"""
+    result = []
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children', 'r') as f:
+            children = [int(p) for p in f.read().split()]
+    except OSError:
+        return result
+    for child in children:
+        result.append(child)
+        result.extend(child_pids(child))
+    return result
+
+
+def process_tree_rss(pid):
+    """统计进程树内存，返回 (总 RSS, 浏览器进程 RSS)"""
+    total = read_rss_bytes(pid)
+    browser = 0
+    for child in child_pids(pid):
+        rss = read_rss_bytes(child)
+        total += rss
+        try:
+            with open(f'/proc/{child}/cmdline', 'rb') as f:
+                cmdline = f.read()
+        except OSError:
+            continue
+        if b'chrom' in cmdline or b'headless_shell' in cmdline:
+            browser += rss
+    return total, browser
+
+
+# ---------- 指标 ----------
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class RunMetrics:
+    """累计的运行指标，常驻模式下跨多轮累加"""
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.histograms = {}
+        self.status_counts = Counter()
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def observe_spans(self, spans):
+        """把计时记录计入阶段耗时直方图"""
+        with self._lock:
+            for span in spans:
+                phase = span['phase']
+                if phase not in HISTOGRAM_PHASES:
+                    continue
+                histogram = self.histograms.setdefault(phase, {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0})
+                for i, bound in enumerate(BUCKETS):
+                    if span['duration'] <= bound:
+                        histogram['buckets'][i] += 1
+                histogram['sum'] += span['duration']
+                histogram['count'] += 1
+
+    def count_statuses(self, server_results):
+        """按状态计数，server_results 为 {server_id: {'renew_status': ..., 'start_status': ...}}"""
+        with self._lock:
+            for status in server_results.values():
+                self.status_counts.update(status.values())
+
+    def set_gauge(self, name, value, labels=None, help_text=''):
+        with self._lock:
+            family = self.gauges.setdefault(name, {'help': help_text, 'samples': {}})
+            family['samples'][tuple(sorted((labels or {}).items()))] = value
+
+    def render(self, openmetrics=False):
+        """生成指标文本"""
+        lines = []
+
+        def labels_text(labels):
+            if not labels:
+                return ''
+            return '{' + ','.join(f'{k}="{escape_label(v)}"' for k, v in labels) + '}'
+
+        with self._lock:
+            lines.append('# HELP weirdhost_phase_duration_seconds Duration of each automation phase.')
+            lines.append('# TYPE weirdhost_phase_duration_seconds histogram')
+            for phase in HISTOGRAM_PHASES:
+                histogram = self.histograms.get(phase)
+                if not histogram:
+                    continue
+                for bound, count in zip(BUCKETS, histogram['buckets']):
+                    lines.append(f'weirdhost_phase_duration_seconds_bucket{{phase="{phase}",le="{format_value(float(bound))}"}} {count}')
+                lines.append(f'weirdhost_phase_duration_seconds_bucket{{phase="{phase}",le="+Inf"}} {histogram["count"]}')
+                lines.append(f'weirdhost_phase_duration_seconds_sum{{phase="{phase}"}} {round(histogram["sum"], 6)}')
+                lines.append(f'weirdhost_phase_duration_seconds_count{{phase="{phase}"}} {histogram["count"]}')
+
+            # OpenMetrics 中计数器的族名不带 _total，Prometheus 文本格式中带
+            family = 'weirdhost_server_status' if openmetrics else 'weirdhost_server_status_total'
+            lines.append(f'# HELP {family} Number of server phases that ended in each status.')
+            lines.append(f'# TYPE {family} counter')
+            # 已知状态即使为 0 也输出，便于面板上画出完整的序列
+            statuses = self.statuses + sorted(set(self.status_counts) - set(self.statuses))
+            for status in statuses:
+                lines.append(f'weirdhost_server_status_total{{status="{escape_label(status)}"}} {self.status_counts[status]}')
+
+            for name, family in sorted(self.gauges.items()):
+                lines.append(f'# HELP {name} {family["help"]}')
+                lines.append(f'# TYPE {name} gauge')
+                for labels, value in sorted(family['samples'].items()):
+                    lines.append(f'{name}{labels_text(labels)} {format_value(value)}')
+
+        if openmetrics:
+            lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+def write_textfile(path, text):
+    """原子写入 textfile，避免 node_exporter 读到写了一半的文件"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_file, path)
+
+
+def serve_metrics(metrics, port, host='0.0.0.0'):
+    """在后台线程提供 /metrics，按 Accept 头选择 OpenMetrics 或 Prometheus 文本格式"""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+            body = metrics.render(openmetrics=openmetrics).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Weirdhost 本地模拟面板 - 用于离线测试和性能基准
+- 提供服务器页面、시간추가 / Start 按钮、续期成功和"已经续期"弹窗、到期时间
+- 提供面板接口：登录检查、续期、电源信号
+- 支持配置响应延迟和失败注入
+- /bench/buttons?n=500 提供大量按钮的页面，用于按钮扫描基准
+
+用法: python mock_panel.py --port 8080 --servers abc12345,abc67890 --latency 200
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+
+REMEMBER_COOKIE_PREFIX = 'remember_web'
+
+# 页面脚本单独提供，避免脚本内容混入 page.content() 的关键字检查
+PANEL_JS = """
+function csrfToken() {
+    const match = document.cookie.match(/XSRF-TOKEN=([^;]+)/);
+    return match ? decodeURIComponent(match[1]) : '';
+}
+
+function showToast(message, kind) {
+    const toast = document.createElement('div');
+    toast.className = 'toast toast-' + kind;
+    toast.textContent = message;
+    document.body.appendChild(toast);
+}
+
+async function callApi(path, payload) {
+    return fetch(path, {
+        method: 'POST',
+        headers: {
+            'Accept': 'application/json',
+            'Content-Type': 'application/json',
+            'X-Requested-With': 'XMLHttpRequest',
+            'X-XSRF-TOKEN': csrfToken()
+        },
+        body: payload ? JSON.stringify(payload) : null
+    });
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const serverId = document.body.dataset.server;
+
+    const renewButton = document.getElementById('renew-button');
+    const startButton = document.getElementById('start-button');
+    if (!renewButton || !startButton) return;
+
+    renewButton.addEventListener('click', async () => {
+        const response = await callApi('/api/client/notfreeservers/' + serverId + '/renew');
+        const data = await response.json();
+        if (response.ok) {
+            document.getElementById('expire').textContent = data.expires_at;
+            showToast('시간이 추가되었습니다', 'ok');
+        } else if (response.status === 400) {
+            showToast('이미 연장했습니다. 하루에 한번만 가능합니다', 'warn');
+        } else {
+            showToast('오류가 발생했습니다', 'warn');
+        }
+    });
+
+    startButton.addEventListener('click', async (event) => {
+        const button = event.currentTarget;
+        const response = await callApi('/api/client/servers/' + serverId + '/power', {signal: 'start'});
+        if (response.ok) {
+            button.disabled = true;
+            document.getElementById('state').textContent = 'running';
+        } else {
+            showToast('오류가 발생했습니다', 'warn');
+        }
+    });
+});
+"""
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="ko">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<link rel="stylesheet" href="/static/panel.css">
+<script src="/static/panel.js"></script>
+</head>
+<body data-server="{server_id}">
+<img src="/static/banner.png" alt="">
+<main class="container">
+{content}
+</main>
+</body>
+</html>
+"""
+
+PANEL_CSS = "body{font-family:sans-serif}.toast{position:fixed;top:1em;right:1em;padding:1em;background:#eee}"
+
+# 模拟图片资源，用于观察资源屏蔽的效果
+BANNER_BYTES = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64 * 1024
+
+
+class PanelState:
+    """模拟面板的服务器状态"""
+
+    def __init__(self, server_ids, expiry_days=1.0, renew_hours=24.0, renew_cooldown=0.0, running=False):
+        now = datetime.now()
+        self.lock = threading.Lock()
+        self.renew_hours = renew_hours
+        self.renew_cooldown = renew_cooldown
+        self.servers = {
+            server_id: {
+                'expires_at': now + timedelta(days=expiry_days),
+                'last_renew': None,
+                'running': running,
+            }
+            for server_id in server_ids
+        }
+        self.counters = {'renew': 0, 'already': 0, 'start': 0, 'failed': 0}
+
+    def renew(self, server_id):
+        """续期，返回 (是否成功, 到期时间)"""
+        with self.lock:
+            server = self.servers[server_id]
+            now = time.time()
+            if server['last_renew'] is not None and now - server['last_renew'] < self.renew_cooldown:
+                self.counters['already'] += 1
+                return False, server['expires_at']
+
+            server['last_renew'] = now
+            server['expires_at'] += timedelta(hours=self.renew_hours)
+            self.counters['renew'] += 1
+            return True, server['expires_at']
+
+    def start(self, server_id):
+        with self.lock:
+            self.servers[server_id]['running'] = True
+            self.counters['start'] += 1
+
+
+class MockPanelHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    # ---------- 工具 ----------
+
+    @property
+    def panel(self):
+        return self.server.panel
+
+    def log_message(self, format, *args):
+        if self.panel.verbose:
+            super().log_message(format, *args)
+
+    def cookies(self):
+        result = {}
+        for part in (self.headers.get('Cookie') or '').split(';'):
+            if '=' in part:
+                name, value = part.strip().split('=', 1)
+                result[name] = value
+        return result
+
+    def is_logged_in(self):
+        return any(name.startswith(REMEMBER_COOKIE_PREFIX) and value for name, value in self.cookies().items())
+
+    def send(self, status, body=b'', content_type='text/html; charset=utf-8', headers=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or []):
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def send_json(self, status, data, headers=None):
+        self.send(status, json.dumps(data), 'application/json', headers)
+
+    def redirect(self, location, headers=None):
+        self.send(302, b'', headers=[('Location', location)] + list(headers or []))
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def delay(self):
+        if self.panel.latency:
+            time.sleep(self.panel.latency / 1000)
+
+    def should_fail(self):
+        return self.panel.fail_rate and random.random() < self.panel.fail_rate
+
+    def server_id_from(self, path):
+        parts = [p for p in path.split('/') if p]
+        for part in parts:
+            if part in self.panel.state.servers:
+                return part
+        return None
+
+    # ---------- 页面 ----------
+
+    def render_server_page(self, server_id):
+        server = self.panel.state.servers[server_id]
+        expires_at = server['expires_at'].strftime('%Y-%m-%d %H:%M:%S')
+        start_disabled = ' disabled' if server['running'] else ''
+        content = f"""
+<div class="card server-details">
+  <h1>{server_id}</h1>
+  <p>만료: <span id="expire">{expires_at}</span></p>
+  <p>상태: <span id="state">{'running' if server['running'] else 'offline'}</span></p>
+  <button id="renew-button" class="btn btn-primary">시간추가</button>
+  <button id="start-button" class="btn btn-success"{start_disabled}>Start</button>
+</div>
+"""
+        return PAGE_TEMPLATE.format(title=f"Server {server_id}", server_id=server_id, content=content)
+
+    def render_home(self):
+        items = ''.join(
+            f'<li><a href="/server/{server_id}">{server_id}</a></li>'
+            for server_id in self.panel.state.servers
+        )
+        return PAGE_TEMPLATE.format(title='Dashboard', server_id='', content=f'<ul class="panel">{items}</ul>')
+
+    def render_button_bench(self, count, target):
+        """按钮扫描基准页面：count 个无关按钮，最后一个为目标按钮"""
+        buttons = ''.join(f'<button class="btn">Action {i}</button>' for i in range(count))
+        content = f'<div class="card">{buttons}<button class="btn btn-primary">{target}</button></div>'
+        return PAGE_TEMPLATE.format(title='Buttons', server_id='', content=content)
+
+    def render_login(self):
+        content = """
+<form method="post" action="/auth/login" class="card">
+  <input name="username" type="text">
+  <input name="password" type="password">
+  <button type="submit">Login</button>
+</form>
+"""
+        return PAGE_TEMPLATE.format(title='Login', server_id='', content=content)
+
+    # ---------- 路由 ----------
+
+    def do_GET(self):
+        self.delay()
+        url = urlsplit(self.path)
+        path = url.path
+
+        if path == '/static/panel.js':
+            return self.send(200, PANEL_JS, 'application/javascript')
+        if path == '/static/panel.css':
+            return self.send(200, PANEL_CSS, 'text/css')
+        if path == '/static/banner.png':
+            return self.send(200, BANNER_BYTES, 'image/png')
+        if path == '/sanctum/csrf-cookie':
+            return self.send(204, headers=[('Set-Cookie', 'XSRF-TOKEN=mock-token%3D; Path=/')])
+        if path == '/auth/login':
+            return self.send(200, self.render_login())
+        if path == '/bench/buttons':
+            query = parse_qs(url.query)
+            count = int(query.get('n', ['300'])[0])
+            target = query.get('target', ['시간추가'])[0]
+            return self.send(200, self.render_button_bench(count, target))
+
+        if path == '/api/client/account':
+            if not self.is_logged_in():
+                return self.send_json(401, {'errors': [{'detail': 'Unauthenticated.'}]})
+            return self.send_json(200, {'object': 'user', 'attributes': {'username': 'mock'}})
+
+        if not self.is_logged_in():
+            return self.redirect('/auth/login')
+
+        xsrf = [('Set-Cookie', 'XSRF-TOKEN=mock-token%3D; Path=/')]
+        if path in ('', '/'):
+            return self.send(200, self.render_home(), headers=xsrf)
+        if path.startswith('/server/'):
+            server_id = self.server_id_from(path)
+            if not server_id:
+                return self.send(404, 'Not Found')
+            return self.send(200, self.render_server_page(server_id), headers=xsrf)
+
+        return self.send(404, 'Not Found')
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_POST(self):
+        self.delay()
+        path = urlsplit(self.path).path
+        body = self.read_body()
+
+        if path == '/auth/login':
+            form = parse_qs(body.decode('utf-8'))
+            if form.get('username') and form.get('password'):
+                return self.redirect('/', headers=[('Set-Cookie', f'{REMEMBER_COOKIE_PREFIX}_mock=login; Path=/')])
+            return self.redirect('/auth/login')
+
+        if not self.is_logged_in():
+            return self.send_json(401, {'errors': [{'detail': 'Unauthenticated.'}]})
+        if not self.headers.get('X-XSRF-TOKEN'):
+            return self.send_json(419, {'errors': [{'detail': 'CSRF token mismatch.'}]})
+
+        server_id = self.server_id_from(path)
+        if not server_id:
+            return self.send_json(404, {'errors': [{'detail': 'Not Found'}]})
+
+        if self.should_fail():
+            with self.panel.state.lock:
+                self.panel.state.counters['failed'] += 1
+            return self.send_json(500, {'errors': [{'detail': 'Injected failure'}]})
+
+        if path.endswith('/renew'):
+            renewed, expires_at = self.panel.state.renew(server_id)
+            if not renewed:
+                return self.send_json(400, {'errors': [{'detail': '이미 연장했습니다. 하루에 한번만 가능합니다'}]})
+            return self.send_json(200, {'expires_at': expires_at.strftime('%Y-%m-%d %H:%M:%S')})
+
+        if path.endswith('/power'):
+            self.panel.state.start(server_id)
+            return self.send(204)
+
+        return self.send_json(404, {'errors': [{'detail': 'Not Found'}]})
+
+
+class MockPanel:
+    def __init__(self, server_ids, host='127.0.0.1', port=0, latency=0, fail_rate=0.0,
+                 expiry_days=1.0, renew_hours=24.0, renew_cooldown=0.0, running=False, verbose=False):
+        """初始化模拟面板，latency 为每个请求附加的延迟（毫秒），fail_rate 为接口失败概率"""
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.verbose = verbose
+        self.state = PanelState(server_ids, expiry_days, renew_hours, renew_cooldown, running)
+
+        self.httpd = ThreadingHTTPServer((host, port), MockPanelHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.panel = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def server_urls(self):
+        return [f"{self.url}/server/{server_id}" for server_id in self.state.servers]
+
+    def start(self):
+        """在后台线程中启动"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Weirdhost 本地模拟面板')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--servers', default='abc12345', help='逗号分隔的服务器ID')
+    parser.add_argument('--latency', type=int, default=0, help='每个请求的附加延迟（毫秒）')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='续期/启动接口的失败概率 0~1')
+    parser.add_argument('--expiry-days', type=float, default=1.0, help='初始到期时间（天）')
+    parser.add_argument('--renew-hours', type=float, default=24.0, help='每次续期增加的时间（小时）')
+    parser.add_argument('--renew-cooldown', type=float, default=0.0, help='两次续期的最小间隔（秒），间隔内返回"已经续期"')
+    parser.add_argument('--running', action='store_true', help='服务器初始为运行中')
+    parser.add_argument('--verbose', action='store_true', help='输出访问日志')
+    args = parser.parse_args()
+
+    server_ids = [s.strip() for s in args.servers.split(',') if s.strip()]
+    panel = MockPanel(
+        server_ids, args.host, args.port, args.latency, args.fail_rate,
+        args.expiry_days, args.renew_hours, args.renew_cooldown, args.running, args.verbose
+    )
+
+    print(f"🧪 模拟面板已启动: {panel.url}")
+    print(f"WEIRDHOST_URL={panel.url}")
+    print(f"WEIRDHOST_SERVER_URLS={','.join(panel.server_urls())}")
+    try:
+        panel.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        panel.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Weirdhost 面板 HTTP 客户端
+- 复用登录 cookie 直接调用面板接口完成续期和启动，不需要浏览器
+- 同一主机的 keep-alive 连接放入连接池复用，可在多线程中共用
+- 可传入请求调度器，每个请求发出前限速，并把响应状态和耗时反馈给调度器
+"""
+
+import json
+import time
+import queue
+import threading
+import http.client
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit, unquote
+
+
+# 连接断开时可以安全重发的请求方法
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+def readable_body(text):
+    """JSON 响应中的中文/韩文通常被转义为 \\uXXXX，解析后重新输出便于匹配关键字"""
+    try:
+        return json.dumps(json.loads(text), ensure_ascii=False)
+    except ValueError:
+        return text
+
+
+class PanelHttpError(Exception):
+    """面板接口请求失败（网络错误等，非 HTTP 状态码错误）"""
+
+
+class PanelHttpClient:
+    def __init__(self, base_url, cookies=None, timeout=15, pool_size=4, user_agent=DEFAULT_USER_AGENT, scheduler=None):
+        """初始化，cookies 为 {名称: 值} 字典，scheduler 为可选的 RequestScheduler"""
+        parts = urlsplit(base_url)
+        self.base_url = base_url.rstrip('/')
+        self.scheme = parts.scheme or 'https'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.scheduler = scheduler
+
+        self.cookies = dict(cookies or {})
+        self._cookie_lock = threading.Lock()
+
+        # 空闲连接池
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    @classmethod
+    def from_storage_state(cls, base_url, state, **kwargs):
+        """从 Playwright storage_state 中取出属于面板主机的 cookie"""
+        host = urlsplit(base_url).hostname
+
+        def matches(domain):
+            domain = domain.lstrip('.')
+            return host == domain or host.endswith('.' + domain)
+
+        cookies = {
+            cookie['name']: cookie['value']
+            for cookie in (state or {}).get('cookies', [])
+            if matches(cookie.get('domain', ''))
+        }
+        return cls(base_url, cookies, **kwargs)
+
+    # ---------- 连接池 ----------
+
+    def _new_connection(self):
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _acquire(self):
+        """取出空闲连接，返回 (连接, 是否为复用的连接)"""
+        try:
+            return self._pool.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        """关闭所有空闲连接"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    # ---------- Cookie ----------
+
+    def _cookie_header(self):
+        with self._cookie_lock:
+            return '; '.join(f"{name}={value}" for name, value in self.cookies.items())
+
+    def _store_cookies(self, response):
+        for header in response.headers.get_all('Set-Cookie') or []:
+            parsed = SimpleCookie()
+            try:
+                parsed.load(header)
+            except Exception:
+                continue
+            with self._cookie_lock:
+                for name, morsel in parsed.items():
+                    self.cookies[name] = morsel.value
+
+    def _xsrf_token(self):
+        with self._cookie_lock:
+            token = self.cookies.get('XSRF-TOKEN')
+        return unquote(token) if token else None
+
+    # ---------- 请求 ----------
+
+    def request(self, method, path, payload=None, headers=None):
+        """发送请求，返回 (状态码, 响应头, 响应文本)；网络错误抛出 PanelHttpError"""
+        request_headers = {
+            'Accept': 'application/json',
+            'X-Requested-With': 'XMLHttpRequest',
+            'User-Agent': self.user_agent,
+            'Origin': self.base_url,
+            'Referer': f"{self.base_url}/",
+        }
+        body = None
+        if payload is not None:
+            body = json.dumps(payload).encode('utf-8')
+            request_headers['Content-Type'] = 'application/json'
+        if method != 'GET':
+            token = self._xsrf_token()
+            if token:
+                request_headers['X-XSRF-TOKEN'] = token
+        request_headers.update(headers or {})
+
+        if self.scheduler:
+            self.scheduler.acquire(self.base_url)
+        start = time.perf_counter()
+
+        # 复用的连接可能已被服务端关闭，此时换新连接重试一次；
+        # 非幂等请求（如续期 POST）只有在请求尚未发出时才重试，避免服务端重复处理
+        conn, reused = self._acquire()
+        while True:
+            sent = False
+            try:
+                request_headers['Cookie'] = self._cookie_header()
+                conn.request(method, path, body=body, headers=request_headers)
+                sent = True
+                response = conn.getresponse()
+                text = response.read().decode('utf-8', errors='replace')
+                self._store_cookies(response)
+
+                if response.will_close:
+                    conn.close()
+                else:
+                    self._release(conn)
+
+                if self.scheduler:
+                    self.scheduler.observe(self.base_url, response.status, time.perf_counter() - start,
+                                           response.headers.get('Retry-After'))
+                return response.status, response.headers, text
+
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                if not reused or (sent and method not in IDEMPOTENT_METHODS):
+                    raise PanelHttpError(f"{method} {path} 请求失败: {e}") from e
+                conn, reused = self._new_connection(), False
+
+    def ensure_xsrf_token(self, path='/sanctum/csrf-cookie'):
+        """POST 请求前确保已拿到 XSRF-TOKEN cookie"""
+        if not self._xsrf_token():
+            self.request('GET', path)
+        return self._xsrf_token()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+追加写入的进度日志（JSONL）
+- 每个服务器的每个阶段完成后立即追加一行并落盘，进程被杀也不会丢失已完成的进度
+- 重新运行时可以跳过近期已成功的阶段，README 也可以直接从日志生成
+"""
+
+import os
+import json
+import tempfile
+import threading
+from datetime import datetime, timezone, timedelta
+
+
+class ProgressJournal:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, server_id, phase, status):
+        """追加一条阶段结果并立即落盘"""
+        entry = {
+            'ts': datetime.now(timezone.utc).isoformat(),
+            'server': server_id,
+            'phase': phase,
+            'status': status,
+        }
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def entries(self):
+        """读取全部记录，跳过进程被杀时写了一半的行"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError:
+            return []
+
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        return entries
+
+    def latest(self, max_age_hours=None):
+        """每个服务器每个阶段的最新记录 {server: {phase: entry}}，可只取最近 max_age_hours 小时内的"""
+        cutoff = None
+        if max_age_hours is not None:
+            cutoff = datetime.now(timezone.utc) - timedelta(hours=max_age_hours)
+
+        latest = {}
+        for entry in self.entries():
+            if cutoff and datetime.fromisoformat(entry['ts']) < cutoff:
+                continue
+            latest.setdefault(entry['server'], {})[entry['phase']] = entry
+        return latest
+
+    def compact(self, keep_hours=168):
+        """压缩日志：只保留每个服务器每个阶段的最新一条，且不早于 keep_hours 小时
+
+        会重写整个文件，不能与其他进程的追加写入同时进行，应在启动分片等子进程之前调用
+        """
+        with self._lock:
+            latest = self.latest(keep_hours)
+            lines = [
+                json.dumps(entry, ensure_ascii=False) + '\n'
+                for phases in latest.values()
+                for entry in sorted(phases.values(), key=lambda item: item['ts'])
+            ]
+            if not lines and not os.path.exists(self.path):
+                return
+
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_file = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path) + '.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.writelines(lines)
+                os.replace(temp_file, self.path)
+            except BaseException:
+                os.unlink(temp_file)
+                raise
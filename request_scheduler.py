@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按主机限速的请求调度器（令牌桶）
+- 所有页面导航、按钮点击和面板接口请求在发出前先取令牌，速率和突发量可配置
+- 遇到 429/503 时速率减半并按 Retry-After 暂停，响应变慢时逐步降速，响应正常时逐步恢复
+- 多个线程共用同一个调度器
+"""
+
+import os
+import time
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+
+# 被限流时最长暂停多久（秒），避免异常的 Retry-After 让整次运行卡住
+MAX_PAUSE_SECONDS = 120
+
+# 降速的下限不低于此值（每秒请求数），避免速率降到 0 后无法再发出请求
+MIN_RATE_FLOOR = 0.01
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 头（秒数或 HTTP 日期），无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+
+class RequestScheduler:
+    def __init__(self, rate=None, burst=None, min_rate=None, slow_seconds=None, log=None):
+        """rate 为每个主机每秒最多发出的请求数，0 表示不限速；burst 为空闲后允许连续发出的请求数"""
+        self.max_rate = float(os.getenv('WEIRDHOST_RATE', '2') if rate is None else rate)
+        self.burst = max(1, int(os.getenv('WEIRDHOST_BURST', '6') if burst is None else burst))
+        self.min_rate = max(MIN_RATE_FLOOR, float(os.getenv('WEIRDHOST_MIN_RATE', '0.1') if min_rate is None else min_rate))
+        if self.max_rate > 0:
+            # 降速下限不能高于最大速率，否则退避时反而会把速率提高到配置的上限之上（分片时两者都会被除）
+            self.min_rate = min(self.min_rate, self.max_rate)
+        self.slow_seconds = float(os.getenv('WEIRDHOST_SLOW_SECONDS', '5') if slow_seconds is None else slow_seconds)
+        self.log = log or (lambda message, level="INFO": None)
+
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_rate > 0
+
+    def _bucket(self, url):
+        host = urlsplit(url).netloc or url
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = HostBucket(self.max_rate, self.burst)
+        return host, bucket
+
+    def _refill(self, bucket, now):
+        bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+        bucket.updated = now
+
+    def acquire(self, url):
+        """等待目标主机的令牌，返回等待的秒数"""
+        if not self.enabled:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                _, bucket = self._bucket(url)
+                now = time.monotonic()
+                self._refill(bucket, now)
+                if now < bucket.paused_until:
+                    delay = bucket.paused_until - now
+                elif bucket.tokens >= 1:
+                    bucket.tokens -= 1
+                    return waited
+                else:
+                    delay = (1 - bucket.tokens) / bucket.rate
+            time.sleep(delay)
+            waited += delay
+
+    def observe(self, url, status=None, elapsed=None, retry_after=None):
+        """根据响应调整目标主机的速率：限流时减半并暂停，变慢时降速，正常时逐步恢复"""
+        if not self.enabled:
+            return
+
+        message = None
+        with self._lock:
+            host, bucket = self._bucket(url)
+            now = time.monotonic()
+            self._refill(bucket, now)
+
+            if status == 429 or (status == 503 and retry_after):
+                bucket.rate = max(self.min_rate, bucket.rate / 2)
+                bucket.tokens = 0.0
+                pause = parse_retry_after(retry_after)
+                pause = min(MAX_PAUSE_SECONDS, pause if pause is not None else 1 / bucket.rate)
+                bucket.paused_until = max(bucket.paused_until, now + pause)
+                message = f"🚦 {host} 返回 {status}，暂停 {pause:.1f}s，速率降至 {bucket.rate:.2f}/s"
+            elif elapsed is not None and elapsed > self.slow_seconds:
+                rate = max(self.min_rate, bucket.rate * 0.75)
+                if rate < bucket.rate:
+                    message = f"🚦 {host} 响应较慢 ({elapsed:.1f}s)，速率降至 {rate:.2f}/s"
+                bucket.rate = rate
+            elif status is not None and status < 400:
+                bucket.rate = min(self.max_rate, bucket.rate + self.max_rate * 0.1)
+
+        if message:
+            self.log(message, "WARNING")
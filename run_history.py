@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行历史（SQLite）
+- 每次运行记录每个服务器每个阶段的结果和耗时
+- README 从历史中的最新状态生成，状态有变化时才需要重写
+- 可查询续期/启动耗时的变化趋势
+"""
+
+import os
+import sqlite3
+from contextlib import closing
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    total_seconds REAL
+);
+CREATE TABLE IF NOT EXISTS phase_results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    server_id TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    status TEXT NOT NULL,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS idx_phase_results_server ON phase_results(server_id, phase, run_id);
+"""
+
+# 这些状态表示本次没有实际处理，不覆盖历史中的最新状态
+PASSIVE_STATUSES = ('skipped_not_due', '未执行')
+
+
+class RunHistory:
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def record_run(self, started_at, total_seconds, outcomes):
+        """记录一次运行，outcomes 为 [(server_id, phase, status, duration), ...]，返回运行编号"""
+        with closing(self.connect()) as conn, conn:
+            cursor = conn.execute(
+                'INSERT INTO runs (started_at, total_seconds) VALUES (?, ?)',
+                (started_at, total_seconds)
+            )
+            run_id = cursor.lastrowid
+            conn.executemany(
+                'INSERT INTO phase_results (run_id, server_id, phase, status, duration) VALUES (?, ?, ?, ?, ?)',
+                [(run_id, server_id, phase, status, duration) for server_id, phase, status, duration in outcomes]
+            )
+        return run_id
+
+    def latest_statuses(self, server_ids):
+        """每个服务器每个阶段最近一次实际处理的状态 {server_id: {phase: status}}"""
+        if not os.path.exists(self.path):
+            return {}
+
+        placeholders = ','.join('?' * len(server_ids))
+        passive = ','.join('?' * len(PASSIVE_STATUSES))
+        query = f"""
+            SELECT p.server_id, p.phase, p.status
+            FROM phase_results p
+            JOIN (
+                SELECT server_id, phase, MAX(run_id) AS run_id
+                FROM phase_results
+                WHERE server_id IN ({placeholders}) AND status NOT IN ({passive})
+                GROUP BY server_id, phase
+            ) latest USING (server_id, phase, run_id)
+        """
+        with closing(self.connect()) as conn:
+            rows = conn.execute(query, [*server_ids, *PASSIVE_STATUSES]).fetchall()
+
+        statuses = {}
+        for server_id, phase, status in rows:
+            statuses.setdefault(server_id, {})[phase] = status
+        return statuses
+
+    def duration_trend(self, server_id, phase, limit=10):
+        """最近 limit 次实际处理的 (开始时间, 状态, 耗时)，按时间从旧到新"""
+        if not os.path.exists(self.path):
+            return []
+
+        query = """
+            SELECT r.started_at, p.status, p.duration
+            FROM phase_results p JOIN runs r ON r.id = p.run_id
+            WHERE p.server_id = ? AND p.phase = ? AND p.duration IS NOT NULL
+            ORDER BY p.run_id DESC LIMIT ?
+        """
+        with closing(self.connect()) as conn:
+            rows = conn.execute(query, (server_id, phase, limit)).fetchall()
+        return rows[::-1]
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排错截图环形缓冲
+- 每个服务器只在内存中保留最近 N 张截图（SCREENSHOT_FRAMES，默认 8），JPEG 格式、仅可视区域
+- 该服务器最终失败时才写入磁盘，写盘在后台线程完成，不阻塞页面操作
+
+SCREENSHOT_MODE: ring（默认）| always（每步都保存整页 PNG，旧行为）| off
+"""
+
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ScreenshotRing:
+    def __init__(self, directory='screenshots', frames=None, mode=None, quality=None, log=print):
+        self.directory = directory
+        self.frames = frames or int(os.getenv('SCREENSHOT_FRAMES', '8'))
+        self.mode = (mode or os.getenv('SCREENSHOT_MODE', 'ring')).lower()
+        self.quality = quality or int(os.getenv('SCREENSHOT_QUALITY', '60'))
+        self.log = log
+
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self._writer = None
+
+    def capture(self, page, key, name):
+        """截图：环形模式下放入 key 对应的缓冲区，always 模式下直接保存整页 PNG"""
+        if self.mode == 'off':
+            return
+        name = os.path.splitext(name)[0]
+
+        try:
+            if self.mode == 'always':
+                os.makedirs(self.directory, exist_ok=True)
+                path = os.path.join(self.directory, f"{name}.png")
+                page.screenshot(path=path, full_page=True)
+                self.log(f"📸 截图保存: {path}")
+                return
+
+            data = page.screenshot(type='jpeg', quality=self.quality, full_page=False)
+        except Exception as e:
+            self.log(f"截图失败: {e}")
+            return
+
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = self._buffers[key] = deque(maxlen=self.frames)
+            buffer.append((name, data))
+
+    def flush(self, key):
+        """把 key 缓冲区中的截图交给后台线程写盘"""
+        with self._lock:
+            frames = list(self._buffers.pop(key, ()))
+        if not frames:
+            return
+
+        with self._lock:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='screenshot')
+            writer = self._writer
+
+        paths = [os.path.join(self.directory, f"{name}.jpg") for name, _ in frames]
+        writer.submit(self._write, frames, paths)
+        self.log(f"📸 保存 {len(frames)} 张失败截图: {', '.join(paths)}")
+
+    def discard(self, key):
+        """丢弃 key 缓冲区（该服务器处理成功）"""
+        with self._lock:
+            self._buffers.pop(key, None)
+
+    def finish(self, key, failed):
+        """服务器处理结束：失败则写盘，否则丢弃"""
+        if failed:
+            self.flush(key)
+        else:
+            self.discard(key)
+
+    def flush_all(self):
+        """写出所有缓冲区，用于异常退出"""
+        with self._lock:
+            keys = list(self._buffers)
+        for key in keys:
+            self.flush(key)
+
+    def close(self):
+        """等待后台写盘完成"""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.shutdown(wait=True)
+
+    def _write(self, frames, paths):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            for (_, data), path in zip(frames, paths):
+                with open(path, 'wb') as f:
+                    f.write(data)
+        except OSError as e:
+            self.log(f"写入截图失败: {e}")
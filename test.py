@@ -11,7 +11,12 @@ import os
 import sys
 import time
 from datetime import datetime, timezone, timedelta
+from urllib.parse import urlsplit
 from playwright.sync_api import sync_playwright, TimeoutError
+from browser_host import connect_or_launch
+from screenshot_ring import ScreenshotRing
+from diagnostics import Diagnostics
+from request_scheduler import RequestScheduler
 
 
 class WeirdhostAuto:
@@ -29,19 +34,45 @@ class WeirdhostAuto:
         self.server_list = [u.strip() for u in self.server_urls.split(',') if u.strip()]
         self.server_results = {}
 
+        # 截图先放在内存中，服务器失败时才写入 screenshots/
+        self.screenshots = ScreenshotRing("screenshots", log=self.log)
+
+        # 可选的 trace/HAR 诊断记录（WEIRDHOST_DIAGNOSTICS=trace,har），只保留失败服务器
+        self.diagnostics = Diagnostics(log=self.log)
+        self.recorder = None
+
+        # 导航和点击按主机限速，遇到 429 或响应变慢时自动降速（WEIRDHOST_RATE / WEIRDHOST_BURST）
+        self.scheduler = RequestScheduler(log=self.log)
+
     # ---------- 工具 ----------
 
     def log(self, msg, level="INFO"):
         print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {level}: {msg}")
 
-    def screenshot(self, page, name):
+    def screenshot(self, page, key, name):
+        self.screenshots.capture(page, key, name)
+
+    def goto(self, page, url=None, wait_until="networkidle"):
+        """限速后访问页面，url 为空时刷新当前页面"""
+        self.scheduler.acquire(url or page.url)
+        start = time.perf_counter()
+        response = page.goto(url, wait_until=wait_until) if url else page.reload(wait_until=wait_until)
+        if response is not None:
+            self.scheduler.observe(response.url, response.status, time.perf_counter() - start,
+                                   response.headers.get('retry-after'))
+        return response
+
+    def click(self, page, button):
+        """限速后点击按钮"""
+        self.scheduler.acquire(page.url)
+        button.click()
+
+    def wait_idle(self, page, timeout=5000):
+        """等待网络空闲，条件满足立即返回，最多等待 timeout 毫秒"""
         try:
-            os.makedirs("screenshots", exist_ok=True)
-            path = f"screenshots/{name}.png"
-            page.screenshot(path=path, full_page=True)
-            self.log(f"📸 截图保存: {path}")
-        except Exception as e:
-            self.log(f"截图失败: {e}", "WARNING")
+            page.wait_for_load_state("networkidle", timeout=timeout)
+        except TimeoutError:
+            self.log(f"等待网络空闲超时 ({timeout}ms)", "WARNING")
 
     # ---------- 登录 ----------
 
@@ -50,14 +81,14 @@ class WeirdhostAuto:
         context.add_cookies([{
             'name': 'remember_web_59ba36addc2b2f9401580f014c7f58ea4e30989d',
             'value': self.remember_web_cookie,
-            'domain': 'hub.weirdhost.xyz',
+            'domain': urlsplit(self.url).hostname,
             'path': '/',
-            'secure': True,
+            'secure': urlsplit(self.url).scheme == 'https',
             'httpOnly': True
         }])
-        page.goto(self.url, wait_until="domcontentloaded")
-        time.sleep(5)
-        self.screenshot(page, "login_home")
+        self.goto(page, self.url, wait_until="domcontentloaded")
+        self.wait_idle(page)
+        self.screenshot(page, "login", "login_home")
         return "login" not in page.url and "auth" not in page.url
 
     # ---------- 服务器操作 ----------
@@ -66,28 +97,25 @@ class WeirdhostAuto:
         sid = server_url.split("/")[-1]
         self.log(f"开始续期 {sid}")
 
-        page.goto(server_url, wait_until="networkidle")
-        time.sleep(3)
-        self.screenshot(page, f"server_{sid}_01_loaded")
+        self.goto(page, server_url)
+        self.screenshot(page, sid, f"server_{sid}_01_loaded")
 
         button = page.locator('button:has-text("시간")')
         if not button.count():
-            self.screenshot(page, f"server_{sid}_02_no_renew_button")
+            self.screenshot(page, sid, f"server_{sid}_02_no_renew_button")
             return "no_renew_button"
 
-        self.screenshot(page, f"server_{sid}_02_renew_button_found")
+        self.screenshot(page, sid, f"server_{sid}_02_renew_button_found")
 
         button.first.hover()
-        time.sleep(1)
-        self.screenshot(page, f"server_{sid}_03_before_renew_click")
+        self.screenshot(page, sid, f"server_{sid}_03_before_renew_click")
 
-        button.first.click()
-        time.sleep(5)
-        self.screenshot(page, f"server_{sid}_04_after_renew_click")
+        self.click(page, button.first)
+        self.wait_idle(page)
+        self.screenshot(page, sid, f"server_{sid}_04_after_renew_click")
 
-        page.reload(wait_until="networkidle")
-        time.sleep(3)
-        self.screenshot(page, f"server_{sid}_05_after_reload")
+        self.goto(page)
+        self.screenshot(page, sid, f"server_{sid}_05_after_reload")
 
         return "renew_clicked"
 
@@ -95,51 +123,67 @@ class WeirdhostAuto:
         sid = server_url.split("/")[-1]
         self.log(f"开始启动 {sid}")
 
-        page.reload(wait_until="networkidle")
-        time.sleep(3)
-        self.screenshot(page, f"server_{sid}_06_start_before")
+        self.goto(page)
+        self.screenshot(page, sid, f"server_{sid}_06_start_before")
 
         button = page.locator('button:has-text("Start")')
         if not button.count():
-            self.screenshot(page, f"server_{sid}_06_no_start_button")
+            self.screenshot(page, sid, f"server_{sid}_06_no_start_button")
             return "no_start_button"
 
         button.first.hover()
-        time.sleep(1)
-        button.first.click()
-        time.sleep(5)
+        self.click(page, button.first)
+        self.wait_idle(page)
 
-        self.screenshot(page, f"server_{sid}_07_start_after")
+        self.screenshot(page, sid, f"server_{sid}_07_start_after")
         return "start_clicked"
 
     # ---------- 主流程 ----------
 
     def process_server(self, page, url):
         sid = url.split("/")[-1]
-        self.server_results[sid] = {}
+        self.server_results[sid] = {'renew': 'error', 'start': 'error'}
 
-        self.server_results[sid]['renew'] = self.renew_server(page, url)
-        time.sleep(5)
-        self.server_results[sid]['start'] = self.start_server(page, url)
+        if self.recorder:
+            self.recorder.begin(sid)
+        try:
+            self.server_results[sid]['renew'] = self.renew_server(page, url)
+            self.server_results[sid]['start'] = self.start_server(page, url)
+        finally:
+            # 只有失败的服务器才保存截图和诊断记录
+            result = self.server_results[sid]
+            failed = result['renew'] != 'renew_clicked' or result['start'] != 'start_clicked'
+            self.screenshots.finish(sid, failed)
+            if self.recorder:
+                self.recorder.end(failed)
 
     def run(self):
         with sync_playwright() as p:
-            browser = p.chromium.launch(
+            # 优先连接常驻浏览器，不可用时自行启动
+            browser, _ = connect_or_launch(
+                p,
                 headless=self.headless,
-                args=['--disable-blink-features=AutomationControlled']
+                args=['--disable-blink-features=AutomationControlled'],
+                log=self.log
             )
             context = browser.new_context(
                 viewport={'width': 1920, 'height': 1080}
             )
+            self.recorder = self.diagnostics.attach(context)
             page = context.new_page()
 
             if not self.login_with_cookie(context, page):
                 self.log("❌ Cookie 登录失败", "ERROR")
+                self.screenshots.flush("login")
+                self.screenshots.close()
                 sys.exit(1)
+            self.screenshots.discard("login")
 
-            for url in self.server_list:
-                self.process_server(page, url)
-                time.sleep(8)
+            try:
+                for url in self.server_list:
+                    self.process_server(page, url)
+            finally:
+                self.screenshots.close()
 
             browser.close()
 
@@ -163,7 +207,7 @@ def main():
     for sid, r in auto.server_results.items():
         print(f"{sid} | renew={r['renew']} | start={r['start']}")
 
-    print("\n🎯 截图目录：screenshots/")
+    print("\n🎯 失败服务器的截图目录：screenshots/")
     print("👉 请在 GitHub Actions 下载 screenshots 进行人工核对")
 
 
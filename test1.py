@@ -7,15 +7,222 @@ Weirdhost 续期和启动脚本 - GitHub Actions 版本
 """
 
 import os
+import re
 import sys
+import json
 import time
+import signal
+import queue
+import socket
+import tempfile
+import threading
+import functools
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
 from datetime import datetime, timezone, timedelta
-from playwright.sync_api import sync_playwright, TimeoutError, expect
+from urllib.parse import urlsplit
+from panel_http import PanelHttpClient, PanelHttpError, readable_body
+from browser_host import find_browser_host
+from diagnostics import Diagnostics
+from progress_journal import ProgressJournal
+from run_history import RunHistory, PASSIVE_STATUSES
+from metrics import RunMetrics, process_tree_rss, write_textfile, serve_metrics
+from request_scheduler import RequestScheduler
+from challenge_detector import detect_challenge, wait_for_clear
+
+
+# 面板的 remember_web cookie 名称
+REMEMBER_COOKIE_NAME = 'remember_web_59ba36addc2b2f9401580f014c7f58ea4e30989d'
+
+# 每个服务器依次执行的操作阶段
+PHASES = ('renew', 'start')
+
+# 视为成功的续期/启动状态
+RENEW_OK_STATUSES = ['renew_success', 'already_renewed', 'skipped_not_due']
+START_OK_STATUSES = ['start_success', 'already_started', 'skipped_not_due']
+PHASE_OK_STATUSES = {'renew': RENEW_OK_STATUSES, 'start': START_OK_STATUSES}
+
+# 页面或接口响应中的到期时间，如 2026-01-14 18:19:46
+EXPIRY_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})(?:[ T](\d{2}:\d{2}(?::\d{2})?))?')
+
+# README 中的时间，比较新旧 README 时忽略
+README_TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}')
+
+# 状态消息映射，README 和 status 命令共用
+STATUS_MESSAGES = {
+    # 续期状态
+    "renew_success": "✅ 续期成功",
+    "already_renewed": "🔄 已经续期过",
+    "no_renew_button": "❌ 未找到续期按钮",
+    "renew_button_disabled": "❌ 续期按钮不可用(可能被CF屏蔽)",
+    "renew_unknown_changed": "⚠️ 续期页面变化但结果未知",
+    "renew_no_change": "⚠️ 续期页面无变化",
+    "renew_failed": "❌ 续期请求失败",
+    "renew_click_error": "💥 点击续期按钮出错",
+    "renew_error": "💥 续期过程出错",
+    
+    # 启动状态
+    "start_success": "✅ 启动成功",
+    "already_started": "🔄 已经启动",
+    "no_start_button": "❌ 未找到Start按钮",
+    "start_unknown": "⚠️ 启动完成但状态未知",
+    "start_failed": "❌ 启动请求失败",
+    "start_error": "💥 启动过程出错",
+    
+    # 跳过状态
+    "skipped_not_due": "⏭️ 未到续期时间，已跳过",
+    
+    # 通用状态
+    "login_failed": "❌ 登录失败",
+    "error": "💥 运行出错",
+    "未执行": "⏸️ 未执行",
+    
+    # 错误状态
+    "error: no_auth": "❌ 无认证信息",
+    "error: no_servers": "❌ 无服务器配置",
+    "error: timeout": "⏰ 操作超时",
+    "error: runtime": "💥 运行时错误"
+}
+
+# 被屏蔽资源的平均大小（字节），用于估算节省的流量
+ESTIMATED_RESOURCE_BYTES = {
+    'image': 40 * 1024,
+    'media': 500 * 1024,
+    'font': 60 * 1024,
+    'stylesheet': 30 * 1024,
+    'script': 80 * 1024,
+}
+
+# 永不屏蔽的地址（CF挑战依赖的资源）
+NEVER_BLOCK_PATTERNS = ['challenges.cloudflare.com', '/cdn-cgi/']
+
+
+def timed(phase):
+    """方法计时装饰器，整个方法调用记为一个 phase 阶段"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.span(phase):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# 页面内等待条件：任一选择器对应的元素可见，或页面文本包含任一关键字
+# 返回命中的选择器/关键字，均未命中时返回 false 继续等待
+WAIT_CONDITION_JS = """
+({selectors, texts}) => {
+    for (const selector of selectors) {
+        for (const el of document.querySelectorAll(selector)) {
+            const rect = el.getBoundingClientRect();
+            if (rect.width > 0 && rect.height > 0) return selector;
+        }
+    }
+    const body = document.body ? document.body.innerText.toLowerCase() : '';
+    for (const text of texts) {
+        if (body.includes(text.toLowerCase())) return text;
+    }
+    return false;
+}
+"""
+
+
+# 结果提示所在的弹窗和 toast 节点，续期结果只在这些节点的文本中匹配，避免页面其他位置的字样误判
+NOTICE_SELECTOR = (
+    '[role="alert"], [role="alertdialog"], [role="dialog"], [role="status"], [aria-live], '
+    '.toast, .Toastify__toast, .alert, .modal, .swal2-popup, .notification, .notyf__toast'
+)
+
+# 页面变化跟踪：点击前安装 MutationObserver，只记录之后新增或修改的文本（弹窗、提示等）
+# 每条记录标明文本是否位于弹窗或 toast 节点内
+CHANGE_TRACKER_JS = """
+noticeSelector => {
+    if (window.__weirdhostChanges) {
+        window.__weirdhostChanges.length = 0;
+        return;
+    }
+    const changes = window.__weirdhostChanges = [];
+    const inNotice = node => {
+        const el = node.nodeType === Node.ELEMENT_NODE ? node : node.parentElement;
+        return !!el && !!el.closest(noticeSelector);
+    };
+    const record = (text, notice) => {
+        text = (text || '').trim();
+        if (text && changes.length < 200) changes.push({text: text.slice(0, 500), notice});
+    };
+    new MutationObserver(mutations => {
+        for (const mutation of mutations) {
+            if (mutation.type === 'characterData') {
+                record(mutation.target.textContent, inNotice(mutation.target));
+                continue;
+            }
+            for (const node of mutation.addedNodes) {
+                if (node.nodeType === Node.TEXT_NODE) {
+                    record(node.textContent, inNotice(node));
+                } else if (node.nodeType === Node.ELEMENT_NODE && !['SCRIPT', 'STYLE'].includes(node.tagName)) {
+                    const notice = inNotice(node);
+                    record(node.innerText || node.textContent, notice);
+                    // 新增的大块内容中包含的弹窗或 toast 单独记录
+                    if (!notice) {
+                        for (const el of node.querySelectorAll(noticeSelector)) record(el.innerText || el.textContent, true);
+                    }
+                }
+            }
+        }
+    }).observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+}
+"""
+
+# 等待弹窗或 toast 中出现任一关键字
+CHANGE_WAIT_JS = """
+patterns => (window.__weirdhostChanges || []).some(
+    change => change.notice && patterns.some(pattern => change.text.toLowerCase().includes(pattern))
+)
+"""
+
+# 备用按钮查找：在页面内一次扫描所有按钮，先查找普通按钮，再查找带样式类的按钮
+# 命中的元素打上标记属性，返回标记值供 Python 端生成定位器
+BUTTON_MATCH_ATTR = 'data-weirdhost-match'
+FIND_BUTTON_JS = """
+({keywords, exactMatch, marker}) => {
+    const groups = [
+        ['文本搜索', 'button'],
+        ['class', 'button.btn-primary, button.btn-success, button.btn-info, button.is-primary, .btn, .button']
+    ];
+    for (const [method, selector] of groups) {
+        for (const el of document.querySelectorAll(selector)) {
+            const rect = el.getBoundingClientRect();
+            if (!rect.width || !rect.height) continue;
+            const style = getComputedStyle(el);
+            if (style.visibility === 'hidden' || style.display === 'none') continue;
+
+            const text = (el.textContent || '').trim();
+            const hit = exactMatch
+                ? keywords.some(k => k === text)
+                : keywords.some(k => text.includes(k));
+            if (hit) {
+                const token = String(Date.now()) + Math.random().toString(36).slice(2);
+                el.setAttribute(marker, token);
+                return {method, text, token};
+            }
+        }
+    }
+    return null;
+}
+"""
+
+
+# 多个账号（多个实例）共用日志输出
+LOG_LOCK = threading.Lock()
 
 
 class WeirdhostAuto:
-    def __init__(self):
-        """初始化，从环境变量读取配置"""
+    def __init__(self, account=None):
+        """初始化，从环境变量读取配置；account 为多账号配置中的一项，覆盖认证信息、服务器列表和并发数"""
+        account = account or {}
+        self.account_name = account.get('name', '')
+        
         self.url = os.getenv('WEIRDHOST_URL', 'https://hub.weirdhost.xyz')
         self.server_urls = os.getenv('WEIRDHOST_SERVER_URLS', '')
         self.login_url = os.getenv('WEIRDHOST_LOGIN_URL', 'https://hub.weirdhost.xyz/auth/login')
@@ -25,22 +232,194 @@ class WeirdhostAuto:
         self.email = os.getenv('WEIRDHOST_EMAIL', '')
         self.password = os.getenv('WEIRDHOST_PASSWORD', '')
         
+        if account:
+            self.remember_web_cookie = account.get('remember_web_cookie', '')
+            self.email = account.get('email', '')
+            self.password = account.get('password', '')
+            server_urls = account.get('server_urls', '')
+            self.server_urls = ','.join(server_urls) if isinstance(server_urls, list) else server_urls
+        
         # 浏览器配置
         self.headless = os.getenv('HEADLESS', 'true').lower() == 'true'
         self.slow_mo = int(os.getenv('SLOW_MO', '100'))  # 添加延迟模拟人类操作
         
+        # 并发配置：同时处理的服务器数量，1 表示按顺序逐个处理
+        self.concurrency = max(1, int(account.get('concurrency') or os.getenv('WEIRDHOST_CONCURRENCY', '1')))
+        
         # 解析服务器URL列表
         self.server_list = []
         if self.server_urls:
             self.server_list = [url.strip() for url in self.server_urls.split(',') if url.strip()]
         
+        # 请求拦截：屏蔽不影响续期的资源类型和地址，默认不屏蔽，需要时显式开启，
+        # 例如 WEIRDHOST_BLOCK_TYPES=image,media,font、WEIRDHOST_BLOCK_PATTERNS=google-analytics.com,doubleclick.net
+        self.block_types = {t.strip() for t in os.getenv('WEIRDHOST_BLOCK_TYPES', '').split(',') if t.strip()}
+        self.block_patterns = [p.strip() for p in os.getenv('WEIRDHOST_BLOCK_PATTERNS', '').split(',') if p.strip()]
+        self.block_stats = {'blocked': 0, 'estimated_bytes': 0, 'by_type': {}}
+        self._block_lock = threading.Lock()
+        
+        # 执行后端：browser 只使用浏览器；http 先直接调用面板接口，失败的操作再回退到浏览器
+        # 续期接口的默认路径是推测值，尚未在真实面板上抓包确认，只有 mock_panel 实现了它，
+        # 因此 HTTP 后端默认关闭；启用前请确认路径，必要时用 WEIRDHOST_RENEW_API/WEIRDHOST_START_API 覆盖
+        self.backend = os.getenv('WEIRDHOST_BACKEND', 'browser').lower()
+        self.renew_api = os.getenv('WEIRDHOST_RENEW_API', '/api/client/notfreeservers/{server_id}/renew')
+        self.start_api = os.getenv('WEIRDHOST_START_API', '/api/client/servers/{server_id}/power')
+        
+        # 本地状态目录：保存登录会话等跨运行复用的数据
+        self.state_dir = os.getenv('WEIRDHOST_STATE_DIR', '.weirdhost')
+        
+        # 多账号时每个账号使用独立的会话和服务器状态文件
+        state_suffix = '-' + re.sub(r'[^\w.-]', '_', self.account_name) if self.account_name else ''
+        self.session_file = os.path.join(self.state_dir, f'session{state_suffix}.json')
+        
+        # 学习到的按钮选择器缓存，按服务器和页面类型记录上次命中的选择器
+        self.selector_cache_file = os.path.join(self.state_dir, 'selectors.json')
+        self.selector_cache = None
+        self._selector_lock = file_lock(self.selector_cache_file)
+        
+        # 轻量登录检查接口，已登录返回 200，未登录返回 401 或跳转登录页
+        self.login_probe_url = os.getenv('WEIRDHOST_PROBE_URL', f"{self.url.rstrip('/')}/api/client/account")
+        
         # 存储每个服务器的结果
         self.server_results = {}
+        
+        # 到期时间缓存：记录每个服务器已知的到期时间和上次续期时间，
+        # 到期时间距现在超过阈值的服务器本次跳过，WEIRDHOST_FORCE=true 强制处理全部
+        self.server_state_file = os.path.join(self.state_dir, f'servers{state_suffix}.json')
+        
+        # 进度日志：每个阶段完成后立即追加，中断后重跑时跳过近期（小时）已成功的阶段
+        self.journal = ProgressJournal(os.path.join(self.state_dir, f'journal{state_suffix}.jsonl'))
+        self.journal_fresh_hours = float(os.getenv('WEIRDHOST_JOURNAL_FRESH_HOURS', '6'))
+        
+        # 运行历史：每次运行每个阶段的结果和耗时，README 从中生成
+        self.history = RunHistory(os.path.join(self.state_dir, f'history{state_suffix}.sqlite3'))
+        self.server_state = load_json_file(self.server_state_file, {})
+        self._server_state_lock = threading.Lock()
+        self.renew_before_hours = float(os.getenv('WEIRDHOST_RENEW_BEFORE_HOURS', '48'))
+        self.force = os.getenv('WEIRDHOST_FORCE', 'false').lower() == 'true'
+        self.panel_tz = timezone(timedelta(hours=float(os.getenv('WEIRDHOST_PANEL_TZ', '9'))))  # 面板显示时间的时区
+        
+        # 失败重试：只重做失败的阶段，每轮间隔按指数退避，所有重试的总耗时不超过预算（秒）
+        self.retry_attempts = int(os.getenv('WEIRDHOST_RETRY_ATTEMPTS', '2'))
+        self.retry_backoff = float(os.getenv('WEIRDHOST_RETRY_BACKOFF', '10'))
+        self.retry_budget = float(os.getenv('WEIRDHOST_RETRY_BUDGET', '300'))
+        
+        # 常驻模式：失败或未能续期的服务器隔多久重试，两次检查之间最长休眠多久
+        self.daemon_retry_minutes = float(os.getenv('WEIRDHOST_DAEMON_RETRY_MINUTES', '60'))
+        self.daemon_max_sleep_hours = float(os.getenv('WEIRDHOST_DAEMON_MAX_SLEEP_HOURS', '12'))
+        # 面板两次续期的最小间隔（小时），续期已确认后至少间隔这么久再续期
+        self.renew_cooldown_hours = float(os.getenv('WEIRDHOST_RENEW_COOLDOWN_HOURS', '24'))
+        
+        # 阶段计时：记录登录、页面加载、查找按钮等阶段的耗时
+        self.timing_file = os.getenv('WEIRDHOST_TIMING_FILE', 'timing_report.json')
+        self.timings = []
+        self.run_started = datetime.now(timezone.utc)
+        self._run_started_perf = time.perf_counter()
+        self._timing_lock = threading.Lock()
+        self._span_local = threading.local()
+        
+        # 并发模式下多个线程共用日志输出，多账号时日志带账号前缀
+        self._log_lock = LOG_LOCK
+        self.log_prefix = f"[{self.account_name}] " if self.account_name else ''
+        
+        # 请求调度：导航、点击和接口请求按主机限速（WEIRDHOST_RATE 每秒请求数、WEIRDHOST_BURST 突发量），
+        # 遇到 429 或响应变慢时自动降速，取代服务器之间固定等待 8 秒
+        self.scheduler = RequestScheduler(log=self.log)
+        self._navigation = threading.local()
+        
+        # CF 挑战：检测到挑战页后最多等待多久（秒）让其自行完成
+        self.challenge_timeout = float(os.getenv('WEIRDHOST_CHALLENGE_TIMEOUT', '30'))
+        
+        # 指标导出：WEIRDHOST_METRICS_FILE 写入 node_exporter textfile，常驻模式下 WEIRDHOST_METRICS_PORT 提供 HTTP
+        self.metrics_file = os.getenv('WEIRDHOST_METRICS_FILE', '')
+        self.metrics_format = os.getenv('WEIRDHOST_METRICS_FORMAT', 'prometheus').lower()
+        self.metrics_port = int(os.getenv('WEIRDHOST_METRICS_PORT', '0'))
+        self.metrics = RunMetrics(statuses=[status for status in STATUS_MESSAGES if not status.startswith('error:')])
+        self.peak_rss = {'total': 0, 'browser': 0}
+        
+        # 可选的 trace/HAR 诊断记录（WEIRDHOST_DIAGNOSTICS=trace,har），每个浏览器上下文一个记录器
+        self.diagnostics = Diagnostics(log=self.log)
+        self._recorders = {}
     
     def log(self, message, level="INFO"):
         """日志输出"""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        print(f"[{timestamp}] {level}: {message}")
+        with self._log_lock:
+            print(f"[{timestamp}] {level}: {self.log_prefix}{message}", flush=True)
+    
+    @contextmanager
+    def span(self, phase, server_id=None):
+        """记录一个阶段的耗时，可嵌套；未指定 server_id 时沿用外层阶段的服务器"""
+        stack = getattr(self._span_local, 'stack', None)
+        if stack is None:
+            stack = self._span_local.stack = []
+        
+        if server_id is None and stack:
+            server_id = stack[-1][1]
+        path = '/'.join([name for name, _ in stack] + [phase])
+        
+        stack.append((phase, server_id))
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            with self._timing_lock:
+                self.timings.append({
+                    'server': server_id,
+                    'phase': phase,
+                    'path': path,
+                    'start': round(start - self._run_started_perf, 3),
+                    'duration': round(end - start, 3)
+                })
+    
+    def build_timing_report(self):
+        """汇总计时记录：按服务器、按阶段统计耗时"""
+        with self._timing_lock:
+            spans = sorted(self.timings, key=lambda item: item['start'])
+        
+        servers = {}
+        phase_totals = {}
+        run_phases = {}
+        
+        for item in spans:
+            totals = phase_totals.setdefault(item['phase'], {'count': 0, 'seconds': 0.0})
+            totals['count'] += 1
+            totals['seconds'] = round(totals['seconds'] + item['duration'], 3)
+            
+            if item['server'] is None:
+                run_phases[item['path']] = round(run_phases.get(item['path'], 0.0) + item['duration'], 3)
+                continue
+            
+            server = servers.setdefault(item['server'], {'total': 0.0, 'phases': {}})
+            if item['path'] == 'server':
+                server['total'] = round(server['total'] + item['duration'], 3)
+            else:
+                phases = server['phases']
+                phases[item['path']] = round(phases.get(item['path'], 0.0) + item['duration'], 3)
+        
+        return {
+            'started_at': self.run_started.isoformat(),
+            'total_seconds': round(time.perf_counter() - self._run_started_perf, 3),
+            'run_phases': run_phases,
+            'servers': servers,
+            'phase_totals': phase_totals,
+            'blocked_requests': dict(self.block_stats, by_type=dict(self.block_stats['by_type'])),
+            'spans': spans
+        }
+    
+    def write_timing_report(self):
+        """写入 JSON 计时报告"""
+        try:
+            report = self.build_timing_report()
+            with open(self.timing_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            
+            self.log(f"⏱️ 计时报告已写入: {self.timing_file} (总耗时 {report['total_seconds']}s)")
+            
+        except Exception as e:
+            self.log(f"写入计时报告失败: {e}", "ERROR")
     
     def has_cookie_auth(self):
         """检查是否有 cookie 认证信息"""
@@ -67,6 +446,134 @@ class WeirdhostAuto:
             self.log(f"检查登录状态时出错: {e}", "ERROR")
             return False
     
+    def probe_login(self, context):
+        """通过轻量接口请求检查登录状态，不加载页面
+        
+        返回 True 已登录，False 未登录，None 无法判断（如遇到CF挑战）
+        """
+        try:
+            self.scheduler.acquire(self.login_probe_url)
+            start = time.perf_counter()
+            response = context.request.get(
+                self.login_probe_url,
+                headers={'Accept': 'application/json'},
+                max_redirects=0,
+                timeout=15000
+            )
+            self.observe_response(response, time.perf_counter() - start)
+            self.log(f"登录检查接口返回: {response.status}")
+            
+            if response.status == 200:
+                return True
+            if response.status in (301, 302, 303, 401, 419):
+                return False
+            return None
+            
+        except Exception as e:
+            self.log(f"登录检查接口请求失败: {e}", "WARNING")
+            return None
+    
+    def verify_login(self, context, page):
+        """检查登录是否有效，接口无法判断时才回退到加载首页检查"""
+        status = self.probe_login(context)
+        if status is not None:
+            return status
+        
+        self.log("接口无法判断登录状态，访问首页检查...")
+        with self.span('navigate'):
+            self.navigate(page, self.url, wait_until="domcontentloaded")
+        
+        # 处理可能的CF挑战
+        self.handle_cf_challenge(page, "登录检查")
+        
+        return self.check_login_status(page)
+    
+    def load_session_state(self):
+        """读取缓存的登录会话（Playwright storage_state），不存在或损坏时返回 None"""
+        try:
+            if not os.path.exists(self.session_file):
+                return None
+            
+            with open(self.session_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            
+            if not state.get('cookies'):
+                return None
+            
+            self.log(f"读取缓存的登录会话: {self.session_file}")
+            return state
+            
+        except Exception as e:
+            self.log(f"读取登录会话缓存失败: {e}", "WARNING")
+            return None
+    
+    def save_session_state(self, context):
+        """保存当前登录会话，包含服务端刷新过的 remember_web cookie"""
+        try:
+            state = context.storage_state()
+            
+            for cookie in state.get('cookies', []):
+                if (cookie['name'].startswith('remember_web_')
+                        and self.remember_web_cookie
+                        and cookie['value'] != self.remember_web_cookie):
+                    self.log("remember_web cookie 已被服务端刷新，新值已保存到会话缓存")
+            
+            # 分片进程可能同时写入，每次使用独立的临时文件（mkstemp 创建的文件权限为 0600）
+            os.makedirs(self.state_dir, exist_ok=True)
+            fd, temp_file = tempfile.mkstemp(dir=self.state_dir, prefix=os.path.basename(self.session_file) + '.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(state, f)
+                os.replace(temp_file, self.session_file)
+            except BaseException:
+                os.unlink(temp_file)
+                raise
+            
+            self.log(f"登录会话已缓存: {self.session_file}")
+            
+        except Exception as e:
+            self.log(f"保存登录会话失败: {e}", "WARNING")
+    
+    @timed('login')
+    def login(self, context, page, session_cached=False):
+        """依次尝试缓存会话、Cookie、邮箱密码登录，成功后缓存会话"""
+        login_success = False
+        
+        # 方案0: 复用缓存的登录会话
+        if session_cached:
+            self.log("检查缓存会话登录状态...")
+            if self.verify_login(context, page):
+                self.log("✅ 缓存会话登录成功！")
+                # 检查过程中服务端可能刷新了 cookie（包括轮换的 remember_web），写回缓存
+                self.save_session_state(context)
+                return True
+            
+            self.log("缓存会话已失效", "WARNING")
+            context.clear_cookies()
+        
+        # 方案1: 尝试 Cookie 登录
+        if self.has_cookie_auth():
+            if self.login_with_cookies(context):
+                self.log("检查Cookie登录状态...")
+                if self.verify_login(context, page):
+                    self.log("✅ Cookie 登录成功！")
+                    login_success = True
+                else:
+                    self.log("Cookie 登录失败，cookies 可能已过期", "WARNING")
+        
+        # 方案2: 如果 Cookie 登录失败，尝试邮箱密码登录
+        if not login_success and self.has_email_auth():
+            if self.login_with_email(page):
+                self.log("检查邮箱密码登录状态...")
+                if self.verify_login(context, page):
+                    self.log("✅ 邮箱密码登录成功！")
+                    login_success = True
+        
+        if login_success:
+            self.save_session_state(context)
+        
+        return login_success
+    
     def login_with_cookies(self, context):
         """使用 Cookies 登录"""
         try:
@@ -74,13 +581,13 @@ class WeirdhostAuto:
             
             # 创建cookie
             session_cookie = {
-                'name': 'remember_web_59ba36addc2b2f9401580f014c7f58ea4e30989d',
+                'name': REMEMBER_COOKIE_NAME,
                 'value': self.remember_web_cookie,
-                'domain': 'hub.weirdhost.xyz',
+                'domain': urlsplit(self.url).hostname,
                 'path': '/',
                 'expires': int(time.time()) + 3600 * 24 * 365,
                 'httpOnly': True,
-                'secure': True,
+                'secure': urlsplit(self.url).scheme == 'https',
                 'sameSite': 'Lax'
             }
             
@@ -99,7 +606,7 @@ class WeirdhostAuto:
             
             # 访问登录页面
             self.log(f"访问登录页面: {self.login_url}")
-            page.goto(self.login_url, wait_until="domcontentloaded")
+            self.navigate(page, self.login_url, wait_until="domcontentloaded")
             
             # 使用固定选择器
             email_selector = 'input[name="username"]'
@@ -122,7 +629,7 @@ class WeirdhostAuto:
             # 点击登录并等待导航
             self.log("点击登录按钮...")
             with page.expect_navigation(wait_until="domcontentloaded", timeout=90000):
-                page.click(login_button_selector)
+                self.throttled_click(page, lambda: page.click(login_button_selector))
             
             # 检查登录是否成功
             if "login" in page.url or "auth" in page.url:
@@ -136,57 +643,135 @@ class WeirdhostAuto:
             self.log(f"邮箱密码登录时出错: {e}", "ERROR")
             return False
     
+    def wait_for_condition(self, page, selectors=(), texts=(), timeout=10000):
+        """等待任一条件成立（元素可见或出现指定文本），成立后立即返回命中项，超时返回 None"""
+        try:
+            handle = page.wait_for_function(
+                WAIT_CONDITION_JS,
+                arg={'selectors': list(selectors), 'texts': list(texts)},
+                timeout=timeout
+            )
+            return handle.json_value()
+        except Exception:
+            return None
+    
+    def install_change_tracker(self, page):
+        """安装页面变化跟踪器，之后新增或修改的文本会被记录"""
+        page.evaluate(CHANGE_TRACKER_JS, NOTICE_SELECTOR)
+    
+    def wait_for_change(self, page, patterns, timeout=10000):
+        """等待跟踪到的弹窗或 toast 变化中出现任一关键字，超时返回 False"""
+        try:
+            page.wait_for_function(
+                CHANGE_WAIT_JS,
+                arg=[pattern.lower() for pattern in patterns],
+                timeout=timeout
+            )
+            return True
+        except Exception:
+            return False
+    
+    def collect_changes(self, page):
+        """取出并清空跟踪到的页面变化，每项为 {text, notice}；页面已跳转时返回空列表"""
+        try:
+            return page.evaluate("() => (window.__weirdhostChanges || []).splice(0)")
+        except Exception:
+            return []
+    
+    def wait_for_enabled(self, button, timeout=5000):
+        """等待按钮变为可点击，超时返回 False"""
+        try:
+            from playwright.sync_api import expect
+            expect(button).to_be_enabled(timeout=timeout)
+            return True
+        except AssertionError:
+            return False
+    
+    def wait_for_disabled(self, button, timeout=5000):
+        """等待按钮变为不可点击，超时返回 False"""
+        try:
+            from playwright.sync_api import expect
+            expect(button).to_be_disabled(timeout=timeout)
+            return True
+        except AssertionError:
+            return False
+    
+    def navigate(self, page, url=None, wait_until="networkidle"):
+        """经调度器限速后访问页面，url 为空时刷新当前页面，返回导航响应"""
+        with self.span('throttle'):
+            self.scheduler.acquire(url or page.url)
+        
+        start = time.perf_counter()
+        if url:
+            response = page.goto(url, wait_until=wait_until)
+        else:
+            response = page.reload(wait_until=wait_until)
+        self.observe_response(response, time.perf_counter() - start)
+        
+        # 留给下一次 CF 挑战检测使用响应状态和响应头
+        self._navigation.response = response
+        return response
+    
+    def throttled_click(self, page, click):
+        """经调度器限速后执行点击"""
+        with self.span('throttle'):
+            self.scheduler.acquire(page.url)
+        click()
+    
+    def observe_response(self, response, elapsed):
+        """把响应状态和耗时反馈给调度器；有请求计时时以请求本身的耗时为准，不含点击前的等待"""
+        if response is None:
+            return
+        try:
+            response_end = response.request.timing.get('responseEnd', -1)
+        except Exception:
+            response_end = -1  # 接口请求（APIResponse）没有请求计时
+        if response_end >= 0:
+            elapsed = response_end / 1000
+        self.scheduler.observe(response.url, response.status, elapsed, response.headers.get('retry-after'))
+    
+    def wait_for_response(self, page, action, predicate, timeout=10000):
+        """执行操作并等待满足条件的网络响应，返回响应对象，超时返回 None"""
+        from playwright.sync_api import TimeoutError
+        
+        try:
+            with page.expect_response(predicate, timeout=timeout) as response_info:
+                action()
+            return response_info.value
+        except TimeoutError:
+            return None
+    
+    @timed('cf_challenge')
     def handle_cf_challenge(self, page, server_id):
-        """处理CF五秒盾挑战"""
-        try:
-            self.log(f"检查服务器 {server_id} 是否遇到CF挑战...")
-            
-            # 检查是否有CF挑战页面
-            cf_selectors = [
-                '#challenge-form',
-                '.challenge-form',
-                '#challenge-running',
-                '#cf-content',
-                '#challenge-stage',
-                'text=Checking your browser'
-            ]
-            
-            for selector in cf_selectors:
-                try:
-                    if page.locator(selector).is_visible(timeout=3000):
-                        self.log(f"⚠️ 服务器 {server_id} 检测到CF挑战，正在等待...")
-                        
-                        # 等待CF挑战完成（通常5-10秒）
-                        wait_time = 10
-                        self.log(f"等待 {wait_time} 秒让CF挑战完成...")
-                        time.sleep(wait_time)
-                        
-                        # 检查挑战是否完成
-                        if page.locator(selector).is_visible(timeout=3000):
-                            self.log(f"⚠️ 服务器 {server_id} CF挑战仍然存在，继续等待...")
-                            time.sleep(5)
-                        
-                        self.log(f"✅ 服务器 {server_id} CF挑战处理完成")
-                        return True
-                except:
-                    continue
-            
-            # 检查是否有"Verify you are human"等文本
-            cf_texts = ["Checking your browser", "Verify", "Security Check", "Cloudflare"]
-            page_text = page.content().lower()
+        """检测CF挑战页面，存在时等待其完成；没有挑战时只需一次页面求值"""
+        # 最近一次导航的响应只在页面仍停留在该地址时使用一次
+        response = getattr(self._navigation, 'response', None)
+        self._navigation.response = None
+        if response is not None and response.url != page.url:
+            response = None
+        
+        try:
+            reason, active = detect_challenge(page, response)
+            if not reason:
+                return False
             
-            for text in cf_texts:
-                if text.lower() in page_text:
-                    self.log(f"⚠️ 服务器 {server_id} 检测到CF相关文本，等待挑战...")
-                    time.sleep(10)
-                    return True
+            # 导航等待网络空闲期间挑战可能已完成并跳转回原地址，此时不需要再等待
+            if not active:
+                self.log(f"✅ 服务器 {server_id} 导航时遇到CF挑战 ({reason})，页面加载完成前已通过")
+                return True
             
-            return False
+            self.log(f"⚠️ 服务器 {server_id} 检测到CF挑战 ({reason})，等待挑战完成...")
+            if wait_for_clear(page, self.challenge_timeout):
+                self.log(f"✅ 服务器 {server_id} CF挑战已完成")
+            else:
+                self.log(f"⚠️ 服务器 {server_id} CF挑战在 {self.challenge_timeout:g} 秒内未完成", "WARNING")
+            return True
             
         except Exception as e:
             self.log(f"检查CF挑战时出错: {e}", "WARNING")
             return False
     
+    @timed('page_ready')
     def wait_for_page_ready(self, page, server_id, operation="操作"):
         """等待页面完全就绪，增加CF挑战处理"""
         self.log(f"等待服务器 {server_id} {operation}页面加载...")
@@ -208,12 +793,14 @@ class WeirdhostAuto:
         except:
             self.log(f"⚠️ 服务器 {server_id} 网络未完全空闲")
         
-        # 额外等待时间确保动态内容加载，特别是CF挑战后
-        time.sleep(3)
+        # 等待动态渲染的按钮出现，特别是CF挑战后
+        if not self.wait_for_condition(page, selectors=['button'], timeout=3000):
+            self.log(f"⚠️ 服务器 {server_id} 页面暂无可见按钮")
         
         # 再次检查CF挑战
         self.handle_cf_challenge(page, server_id)
     
+    @timed('find_button')
     def find_renew_button(self, page, server_id):
         """查找续期按钮 - 使用多种方法"""
         selectors = [
@@ -225,29 +812,14 @@ class WeirdhostAuto:
             'button:has-text("Add Time")',
         ]
         
-        # 先等待页面稳定
-        time.sleep(2)
-        
-        for selector in selectors:
-            try:
-                if selector.startswith('//'):
-                    button = page.locator(f'xpath={selector}')
-                else:
-                    button = page.locator(selector)
-                
-                # 使用更严格的可见性检查
-                button.wait_for(state='visible', timeout=8000)
-                
-                if button.is_visible():
-                    self.log(f"✅ 服务器 {server_id} 找到续期按钮: {selector}")
-                    return button
-                    
-            except Exception as e:
-                continue
+        button = self.resolve_button(page, server_id, 'renew', selectors)
+        if button:
+            return button
         
         # 如果上述方法都失败，尝试更广泛的搜索
         return self.find_button_alternative_methods(page, server_id, ["시간", "Renew", "Add", "추가"])
     
+    @timed('find_button')
     def find_start_button(self, page, server_id):
         """查找启动按钮 - 完全匹配 Start"""
         selectors = [
@@ -258,77 +830,94 @@ class WeirdhostAuto:
             '//button[contains(text(), "Start")]',
         ]
         
-        for selector in selectors:
-            try:
-                if selector.startswith('//'):
-                    button = page.locator(f'xpath={selector}')
-                else:
-                    button = page.locator(selector)
-                
-                # 使用更严格的可见性检查
-                button.wait_for(state='visible', timeout=8000)
-                
-                if button.is_visible():
-                    self.log(f"✅ 服务器 {server_id} 找到启动按钮: {selector}")
-                    return button
-                    
-            except Exception as e:
-                continue
+        button = self.resolve_button(page, server_id, 'start', selectors)
+        if button:
+            return button
         
         # 如果上述方法都失败，尝试更广泛的搜索
         return self.find_button_alternative_methods(page, server_id, ["Start", "시작"], exact_match=True)
     
-    def find_button_alternative_methods(self, page, server_id, keywords, exact_match=False):
-        """备用的按钮查找方法"""
-        # 方法1: 查找所有按钮并筛选
+    def selector_locator(self, page, selector):
+        """把选择器转换为只匹配可见元素的定位器，// 开头的按 XPath 处理"""
+        if selector.startswith('//'):
+            selector = f'xpath={selector}'
+        return page.locator(selector).filter(visible=True)
+    
+    def resolve_button(self, page, server_id, kind, selectors, timeout=8000):
+        """一次性解析候选选择器：优先尝试上次命中的选择器，否则合并所有候选只等待一次"""
+        cached = self.cached_selector(kind, server_id)
+        if cached in selectors:
+            try:
+                button = self.selector_locator(page, cached).first
+                button.wait_for(state='visible', timeout=3000)
+                self.log(f"✅ 服务器 {server_id} 使用缓存选择器找到{kind}按钮: {cached}")
+                return button
+            except Exception:
+                self.log(f"缓存选择器未命中: {cached}")
+        
+        # 合并所有候选选择器，任一可见即返回
+        locators = [self.selector_locator(page, selector) for selector in selectors]
+        combined = locators[0]
+        for locator in locators[1:]:
+            combined = combined.or_(locator)
+        
         try:
-            all_buttons = page.locator('button')
-            button_count = all_buttons.count()
-            
-            for i in range(button_count):
-                try:
-                    button = all_buttons.nth(i)
-                    if button.is_visible():
-                        text = button.text_content().strip()
-                        
-                        if exact_match:
-                            # 完全匹配
-                            if any(keyword == text for keyword in keywords):
-                                self.log(f"✅ 服务器 {server_id} 通过文本搜索找到按钮: '{text}'")
-                                return button
-                        else:
-                            # 包含匹配
-                            if any(keyword in text for keyword in keywords):
-                                self.log(f"✅ 服务器 {server_id} 通过文本搜索找到按钮: '{text}'")
-                                return button
-                except:
-                    continue
-        except:
-            pass
+            combined.first.wait_for(state='visible', timeout=timeout)
+        except Exception:
+            return None
+        
+        # 确定命中的选择器并记住，下次直接使用
+        for selector, locator in zip(selectors, locators):
+            try:
+                if locator.count():
+                    self.log(f"✅ 服务器 {server_id} 找到{kind}按钮: {selector}")
+                    self.remember_selector(kind, server_id, selector)
+                    return locator.first
+            except Exception:
+                continue
         
-        # 方法2: 查找特定class的按钮
+        return combined.first
+    
+    def cached_selector(self, kind, server_id):
+        """读取学习到的选择器：先按服务器，再按页面类型"""
+        with self._selector_lock:
+            if self.selector_cache is None:
+                self.selector_cache = load_json_file(self.selector_cache_file, {})
+            return self.selector_cache.get(f"{kind}:{server_id}") or self.selector_cache.get(kind)
+    
+    def remember_selector(self, kind, server_id, selector):
+        """保存命中的选择器到本地缓存"""
+        with self._selector_lock:
+            if self.selector_cache is None:
+                self.selector_cache = load_json_file(self.selector_cache_file, {})
+            if self.selector_cache.get(f"{kind}:{server_id}") == selector:
+                return
+            # 其他账号实例可能已写入新的选择器，在最新的文件内容上修改
+            self.selector_cache = load_json_file(self.selector_cache_file, {})
+            self.selector_cache[f"{kind}:{server_id}"] = selector
+            self.selector_cache[kind] = selector
+            save_json_file(self.selector_cache_file, self.selector_cache)
+    
+    def find_button_alternative_methods(self, page, server_id, keywords, exact_match=False):
+        """备用的按钮查找方法：在页面内一次扫描所有候选按钮，按文本关键字匹配"""
         try:
-            primary_buttons = page.locator('button.btn-primary, button.btn-success, button.btn-info, button.is-primary, .btn, .button')
-            if primary_buttons.count() > 0:
-                for i in range(primary_buttons.count()):
-                    button = primary_buttons.nth(i)
-                    if button.is_visible():
-                        text = button.text_content().strip()
-                        
-                        if exact_match:
-                            if any(keyword == text for keyword in keywords):
-                                self.log(f"✅ 服务器 {server_id} 通过class找到按钮")
-                                return button
-                        else:
-                            if any(keyword in text for keyword in keywords):
-                                self.log(f"✅ 服务器 {server_id} 通过class找到按钮")
-                                return button
-        except:
-            pass
+            match = page.evaluate(FIND_BUTTON_JS, {
+                'keywords': keywords,
+                'exactMatch': exact_match,
+                'marker': BUTTON_MATCH_ATTR
+            })
+        except Exception as e:
+            self.log(f"⚠️ 服务器 {server_id} 页面内按钮扫描出错: {e}")
+            match = None
+        
+        if match:
+            self.log(f"✅ 服务器 {server_id} 通过{match['method']}找到按钮: '{match['text']}'")
+            return page.locator(f'[{BUTTON_MATCH_ATTR}="{match["token"]}"]')
         
         self.log(f"❌ 服务器 {server_id} 所有方法都未找到按钮")
         return None
     
+    @timed('renew')
     def renew_server(self, page, server_url):
         """续期服务器，增加CF挑战处理"""
         try:
@@ -337,7 +926,8 @@ class WeirdhostAuto:
             
             # 访问服务器页面
             self.log(f"访问服务器页面: {server_url}")
-            page.goto(server_url, wait_until="networkidle")
+            with self.span('navigate'):
+                self.navigate(page, server_url)
             
             # 等待页面加载，包含CF挑战处理
             self.wait_for_page_ready(page, server_id, "续期")
@@ -352,10 +942,12 @@ class WeirdhostAuto:
             # 检查按钮是否被CF屏蔽
             if not button.is_enabled():
                 self.log(f"⚠️ 服务器 {server_id} 续期按钮不可点击，可能被CF屏蔽，等待后重试...")
-                time.sleep(5)
+                if self.wait_for_enabled(button, timeout=5000):
+                    return self.click_renew_button_and_check(page, button, server_id)
                 
                 # 刷新页面重试
-                page.reload(wait_until="networkidle")
+                with self.span('navigate'):
+                    self.navigate(page)
                 self.wait_for_page_ready(page, server_id, "续期重试")
                 
                 button = self.find_renew_button(page, server_id)
@@ -370,59 +962,74 @@ class WeirdhostAuto:
             self.log(f"❌ 服务器 {server_id} 续期过程中出错: {e}")
             return "renew_error"
     
+    def is_action_response(self, response, server_id, phase):
+        """判断响应是否为点击续期/启动按钮触发的面板接口请求"""
+        request = response.request
+        if request.method == 'GET' or request.resource_type not in ('xhr', 'fetch'):
+            return False
+        
+        path = urlsplit(response.url).path
+        api = self.renew_api if phase == 'renew' else self.start_api
+        if path == api.format(server_id=server_id):
+            return True
+        
+        keywords = ('renew',) if phase == 'renew' else ('power', 'start')
+        return server_id in path and any(keyword in path for keyword in keywords)
+    
+    def click_and_capture_response(self, page, button, server_id, phase, timeout=8000):
+        """点击按钮并捕获面板接口响应，返回 (状态码, 响应内容)，没有捕获到时返回 None"""
+        # 先取令牌再计时，耗时不包含限速等待
+        with self.span('throttle'):
+            self.scheduler.acquire(page.url)
+        start = time.perf_counter()
+        response = self.wait_for_response(
+            page,
+            button.click,
+            lambda r: self.is_action_response(r, server_id, phase),
+            timeout=timeout
+        )
+        self.observe_response(response, time.perf_counter() - start)
+        if response is None:
+            self.log(f"⚠️ 服务器 {server_id} 未捕获到{phase}接口响应，改用页面内容判断")
+            return None
+        
+        try:
+            body = response.text()
+        except Exception:
+            body = ''
+        
+        self.log(f"服务器 {server_id} {phase}接口响应: {response.status} {urlsplit(response.url).path}")
+        return response.status, body
+    
     def click_renew_button_and_check(self, page, button, server_id):
         """点击续期按钮并检查结果"""
         try:
             if button.is_enabled():
-                # 点击前保存页面状态用于比较
-                before_click = page.content()
+                # 点击前安装变化跟踪器，只比较点击后新出现的内容
+                self.install_change_tracker(page)
                 
                 self.log(f"✅ 服务器 {server_id} 续期按钮可点击，正在点击...")
                 
-                # 模拟人类操作：鼠标移动到按钮上
-                button.hover()
-                time.sleep(1)
-                
-                # 点击按钮
-                button.click()
-                
-                # 等待页面响应，增加等待时间处理可能的CF验证
-                time.sleep(8)
-                
-                # 检查是否出现CF挑战
-                self.handle_cf_challenge(page, server_id)
-                
-                # 检查页面变化
-                after_click = page.content()
-                
-                # 检查是否出现错误消息
-                error_patterns = [
-                    "already renewed", "can't renew", "only once", 
-                    "이미", "한번", "불가능", "already added",
-                    "failed", "error", "오류"
-                ]
+                with self.span('click'):
+                    # 模拟人类操作：鼠标移动到按钮上
+                    button.hover()
+                    
+                    # 点击按钮，同时捕获面板续期接口的响应
+                    captured = self.click_and_capture_response(page, button, server_id, 'renew')
                 
-                has_error = any(pattern.lower() in after_click.lower() for pattern in error_patterns)
+                # 以接口响应为准，响应到达即可确定结果
+                if captured:
+                    status, body = captured
+                    self.record_expiry(server_id, readable_body(body))
+                    result = self.classify_renew_response(status, body)
+                    if result:
+                        self.log(f"✅ 服务器 {server_id} 续期接口确认结果: {result}")
+                        return result
+                    self.log(f"❌ 服务器 {server_id} 续期接口返回失败: {status}")
+                    return "renew_failed"
                 
-                if has_error:
-                    self.log(f"ℹ️ 服务器 {server_id} 检测到重复续期提示")
-                    return "already_renewed"
-                else:
-                    # 检查是否有成功消息
-                    success_patterns = ["success", "성공", "added", "추가됨", "시간이 추가", "추가되었습니다"]
-                    has_success = any(pattern.lower() in after_click.lower() for pattern in success_patterns)
-                    
-                    if has_success:
-                        self.log(f"✅ 服务器 {server_id} 续期成功")
-                        return "renew_success"
-                    else:
-                        # 检查页面内容是否发生变化
-                        if before_click != after_click:
-                            self.log(f"⚠️ 服务器 {server_id} 页面已变化但无明确结果")
-                            return "renew_unknown_changed"
-                        else:
-                            self.log(f"⚠️ 服务器 {server_id} 页面无变化")
-                            return "renew_no_change"
+                # 等待接口响应期间页面变化已被跟踪，这里只需短暂等待
+                return self.check_renew_result(page, server_id, timeout=2000)
             else:
                 self.log(f"❌ 服务器 {server_id} 续期按钮不可点击")
                 return "renew_button_disabled"
@@ -431,6 +1038,52 @@ class WeirdhostAuto:
             self.log(f"❌ 服务器 {server_id} 点击续期按钮时出错: {e}")
             return "renew_click_error"
     
+    @timed('verify')
+    def check_renew_result(self, page, server_id, timeout=8000):
+        """根据点击后新出现的页面提示判断续期结果"""
+        already_patterns = [
+            "already renewed", "can't renew", "only once",
+            "이미", "한번", "불가능", "already added"
+        ]
+        failure_patterns = ["failed", "error", "오류"]
+        success_patterns = ["success", "성공", "added", "추가됨", "시간이 추가", "추가되었습니다"]
+        
+        # 等待结果提示出现，默认最多8秒（保留处理可能的CF验证的时间）
+        self.wait_for_change(page, already_patterns + failure_patterns + success_patterns, timeout=timeout)
+        
+        # 检查是否出现CF挑战
+        self.handle_cf_challenge(page, server_id)
+        
+        # 只取点击后新增或修改的文本，关键字只在弹窗和 toast 的文本中匹配
+        changes = self.collect_changes(page)
+        changed_text = '\n'.join(change['text'] for change in changes).lower()
+        notice_text = '\n'.join(change['text'] for change in changes if change['notice']).lower()
+        if changes:
+            self.log(f"服务器 {server_id} 点击后页面变化: {changed_text[:200]!r}")
+        
+        # 只有面板明确的重复续期提示才算已续期，其他错误提示按失败处理
+        if any(pattern.lower() in notice_text for pattern in already_patterns):
+            self.log(f"ℹ️ 服务器 {server_id} 检测到重复续期提示")
+            return "already_renewed"
+        
+        if any(pattern.lower() in notice_text for pattern in failure_patterns):
+            self.log(f"❌ 服务器 {server_id} 检测到续期错误提示")
+            return "renew_failed"
+        
+        # 检查是否有成功消息
+        if any(pattern.lower() in notice_text for pattern in success_patterns):
+            self.log(f"✅ 服务器 {server_id} 续期成功")
+            return "renew_success"
+        
+        # 检查页面内容是否发生变化
+        if changes:
+            self.log(f"⚠️ 服务器 {server_id} 页面已变化但无明确结果")
+            return "renew_unknown_changed"
+        
+        self.log(f"⚠️ 服务器 {server_id} 页面无变化")
+        return "renew_no_change"
+    
+    @timed('start')
     def start_server(self, page, server_url):
         """启动服务器"""
         try:
@@ -438,7 +1091,8 @@ class WeirdhostAuto:
             self.log(f"🚀 开始启动服务器 {server_id}")
             
             # 刷新页面确保最新状态
-            page.reload(wait_until="networkidle")
+            with self.span('navigate'):
+                self.navigate(page)
             
             # 等待页面加载，包含CF挑战处理
             self.wait_for_page_ready(page, server_id, "启动")
@@ -453,7 +1107,9 @@ class WeirdhostAuto:
             # 检查按钮是否被CF屏蔽
             if not button.is_enabled():
                 self.log(f"⚠️ 服务器 {server_id} Start按钮不可点击，可能被CF屏蔽，等待后重试...")
-                time.sleep(5)
+                if not self.wait_for_enabled(button, timeout=5000):
+                    self.log(f"ℹ️ 服务器 {server_id} 已启动，按钮不可点击")
+                    return "already_started"
                 
                 # 再次查找按钮
                 button = self.find_start_button(page, server_id)
@@ -465,36 +1121,22 @@ class WeirdhostAuto:
             if button.is_enabled():
                 self.log(f"✅ 服务器 {server_id} 可以启动，正在点击...")
                 
-                # 模拟人类操作
-                button.hover()
-                time.sleep(1)
-                button.click()
+                with self.span('click'):
+                    # 模拟人类操作，同时捕获面板电源接口的响应
+                    button.hover()
+                    captured = self.click_and_capture_response(page, button, server_id, 'start')
                 
-                # 等待操作完成
-                time.sleep(8)
+                # 以接口响应为准，响应到达即可确定结果
+                if captured:
+                    status, body = captured
+                    result = self.classify_start_response(status, body)
+                    if result:
+                        self.log(f"✅ 服务器 {server_id} 启动接口确认结果: {result}")
+                        return result
+                    self.log(f"❌ 服务器 {server_id} 启动接口返回失败: {status}")
+                    return "start_failed"
                 
-                # 检查是否出现CF挑战
-                self.handle_cf_challenge(page, server_id)
-                
-                # 检查是否启动成功
-                # 重新查找按钮，检查是否变为不可用或其他状态
-                try:
-                    new_button = self.find_start_button(page, server_id)
-                    if new_button and not new_button.is_enabled():
-                        self.log(f"✅ 服务器 {server_id} 启动成功，按钮状态已变化")
-                        return "start_success"
-                    else:
-                        # 检查是否有成功消息
-                        page_content = page.content().lower()
-                        if "started" in page_content or "running" in page_content or "启动" in page_content or "시작" in page_content:
-                            self.log(f"✅ 服务器 {server_id} 启动成功")
-                            return "start_success"
-                        else:
-                            self.log(f"⚠️ 服务器 {server_id} 启动操作完成，但状态未知")
-                            return "start_unknown"
-                except:
-                    self.log(f"⚠️ 服务器 {server_id} 启动操作完成，无法验证状态")
-                    return "start_unknown"
+                return self.check_start_result(page, button, server_id)
             else:
                 self.log(f"ℹ️ 服务器 {server_id} 已启动，按钮不可点击")
                 return "already_started"
@@ -503,21 +1145,70 @@ class WeirdhostAuto:
             self.log(f"❌ 服务器 {server_id} 启动过程中出错: {e}")
             return "start_error"
     
-    def process_server(self, page, server_url):
-        """处理单个服务器的续期和启动操作"""
+    @timed('verify')
+    def check_start_result(self, page, button, server_id):
+        """根据按钮状态和页面内容判断启动结果"""
+        # 等待按钮变为不可用（启动中），最多8秒
+        self.wait_for_disabled(button, timeout=8000)
+        
+        # 检查是否出现CF挑战
+        self.handle_cf_challenge(page, server_id)
+        
+        # 检查是否启动成功
+        # 重新查找按钮，检查是否变为不可用或其他状态
+        try:
+            new_button = self.find_start_button(page, server_id)
+            if new_button and not new_button.is_enabled():
+                self.log(f"✅ 服务器 {server_id} 启动成功，按钮状态已变化")
+                return "start_success"
+            else:
+                # 检查是否有成功消息
+                page_content = page.content().lower()
+                if "started" in page_content or "running" in page_content or "启动" in page_content or "시작" in page_content:
+                    self.log(f"✅ 服务器 {server_id} 启动成功")
+                    return "start_success"
+                else:
+                    self.log(f"⚠️ 服务器 {server_id} 启动操作完成，但状态未知")
+                    return "start_unknown"
+        except:
+            self.log(f"⚠️ 服务器 {server_id} 启动操作完成，无法验证状态")
+            return "start_unknown"
+    
+    def process_server(self, page, server_url, phases=PHASES):
+        """处理单个服务器的续期和启动操作，phases 指定需要执行的阶段"""
         server_id = server_url.split('/')[-1] if server_url else "unknown"
         self.log(f"🔧 开始处理服务器 {server_id}")
         
-        # 初始化服务器结果
-        self.server_results[server_id] = {
-            'renew_status': '未执行',
-            'start_status': '未执行'
-        }
+        # 初始化服务器结果，只重做部分阶段时保留其他阶段已有的结果
+        if server_id not in self.server_results or set(phases) == set(PHASES):
+            self.server_results[server_id] = {
+                'renew_status': '未执行',
+                'start_status': '未执行'
+            }
         
+        recorder = self._recorders.get(page.context)
+        if recorder:
+            recorder.begin(server_id)
+        try:
+            with self.span('server', server_id=server_id):
+                return self.process_server_phases(page, server_url, server_id, phases)
+        finally:
+            if recorder:
+                recorder.end(failed=self.is_server_failed(server_id))
+    
+    def is_server_failed(self, server_id):
+        """续期或启动是否未成功"""
+        status = self.server_results.get(server_id) or {}
+        return (status.get('renew_status') not in RENEW_OK_STATUSES
+                or status.get('start_status') not in START_OK_STATUSES)
+    
+    def process_server_phases(self, page, server_url, server_id, phases):
+        """依次执行服务器的各个阶段，出错时只标记本次执行的阶段"""
         try:
             # 访问服务器页面
             self.log(f"访问服务器页面: {server_url}")
-            page.goto(server_url, wait_until="networkidle")
+            with self.span('navigate'):
+                self.navigate(page, server_url)
             
             # 首先处理可能的CF挑战
             self.handle_cf_challenge(page, server_id)
@@ -525,22 +1216,29 @@ class WeirdhostAuto:
             # 检查是否已登录
             if not self.check_login_status(page):
                 self.log(f"服务器 {server_id} 未登录，尝试重新登录", "WARNING")
-                self.server_results[server_id]['renew_status'] = 'login_failed'
-                self.server_results[server_id]['start_status'] = 'login_failed'
+                for phase in phases:
+                    self.set_phase_status(server_id, phase, 'login_failed')
                 return f"{server_id}: login_failed"
             
-            # 第一步：执行续期操作
-            self.log(f"第一步：执行续期操作")
-            renew_result = self.renew_server(page, server_url)
-            self.server_results[server_id]['renew_status'] = renew_result
+            # 记录续期前的到期时间
+            self.read_expiry(page, server_id)
             
-            # 等待一下，确保续期操作完成
-            time.sleep(5)
+            # 第一步：执行续期操作
+            if 'renew' in phases:
+                self.log(f"第一步：执行续期操作")
+                self.set_phase_status(server_id, 'renew', self.renew_server(page, server_url))
+                if self.server_results[server_id]['renew_status'] == 'renew_success':
+                    self.update_server_state(server_id, last_renew=datetime.now(timezone.utc).isoformat())
+            renew_result = self.server_results[server_id]['renew_status']
             
             # 第二步：执行启动操作
-            self.log(f"第二步：执行启动操作")
-            start_result = self.start_server(page, server_url)
-            self.server_results[server_id]['start_status'] = start_result
+            if 'start' in phases:
+                self.log(f"第二步：执行启动操作")
+                self.set_phase_status(server_id, 'start', self.start_server(page, server_url))
+                
+                # 启动前已刷新页面，顺便读取续期后的到期时间
+                self.read_expiry(page, server_id)
+            start_result = self.server_results[server_id]['start_status']
             
             # 返回组合结果
             combined_result = f"renew:{renew_result},start:{start_result}"
@@ -550,27 +1248,319 @@ class WeirdhostAuto:
             
         except Exception as e:
             self.log(f"❌ 处理服务器 {server_id} 时出错: {e}", "ERROR")
-            self.server_results[server_id]['renew_status'] = 'error'
-            self.server_results[server_id]['start_status'] = 'error'
+            for phase in phases:
+                self.set_phase_status(server_id, phase, 'error')
             return f"{server_id}: error"
     
-    def run(self):
-        """主运行函数"""
-        self.log("开始 Weirdhost 自动续期和启动任务")
-        
-        # 检查认证信息
-        has_cookie = self.has_cookie_auth()
-        has_email = self.has_email_auth()
+    def set_phase_status(self, server_id, phase, status):
+        """记录阶段结果，同时追加到进度日志"""
+        self.server_results[server_id][f'{phase}_status'] = status
+        try:
+            self.journal.append(server_id, phase, status)
+        except OSError as e:
+            self.log(f"写入进度日志失败: {e}", "WARNING")
+    
+    # ---------- 到期时间缓存 ----------
+    
+    def parse_expiry(self, text):
+        """从文本中解析到期时间（面板时区），找不到返回 None"""
+        match = EXPIRY_PATTERN.search(text or '')
+        if not match:
+            return None
         
-        self.log(f"Cookie 认证可用: {has_cookie}")
-        self.log(f"邮箱密码认证可用: {has_email}")
+        date_part, time_part = match.group(1), match.group(2) or '00:00:00'
+        if len(time_part) == 5:
+            time_part += ':00'
+        try:
+            expires_at = datetime.strptime(f"{date_part} {time_part}", '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return None
+        return expires_at.replace(tzinfo=self.panel_tz)
+    
+    def read_expiry(self, page, server_id):
+        """读取服务器页面上显示的到期时间并记录"""
+        try:
+            text = page.locator("text=/\\d{4}-\\d{2}-\\d{2}/").first.text_content(timeout=3000)
+        except Exception:
+            return None
+        return self.record_expiry(server_id, text)
+    
+    def record_expiry(self, server_id, text):
+        """从文本中解析到期时间，解析成功则更新到期时间缓存"""
+        expires_at = self.parse_expiry(text)
+        if expires_at:
+            self.update_server_state(server_id, expires_at=expires_at.isoformat())
+            self.log(f"📅 服务器 {server_id} 到期时间: {expires_at:%Y-%m-%d %H:%M:%S}")
+        return expires_at
+    
+    def update_server_state(self, server_id, **fields):
+        """更新单个服务器的缓存状态"""
+        with self._server_state_lock:
+            state = self.server_state.setdefault(server_id, {})
+            state.update(fields)
+            state['updated_at'] = datetime.now(timezone.utc).isoformat()
+    
+    def save_server_state(self):
+        """保存到期时间缓存"""
+        with self._server_state_lock:
+            save_json_file(self.server_state_file, self.server_state)
+    
+    def is_due(self, server_id):
+        """判断服务器是否需要处理：到期时间未知或距现在不足阈值时需要处理"""
+        expires_at = (self.server_state.get(server_id) or {}).get('expires_at')
+        if not expires_at:
+            return True
         
-        if not has_cookie and not has_email:
-            self.log("没有可用的认证信息！", "ERROR")
-            return ["error: no_auth"]
+        remaining = datetime.fromisoformat(expires_at) - datetime.now(timezone.utc)
+        return remaining <= timedelta(hours=self.renew_before_hours)
+    
+    def filter_due_tasks(self, tasks, results_by_url, is_due=None):
+        """未到续期时间的服务器跳过续期、仍检查启动，返回仍需处理的任务；is_due 默认按到期阈值判断"""
+        if self.force and is_due is None:
+            self.log("强制模式：处理全部服务器")
+            return tasks
         
-        # 检查服务器URL列表
-        if not self.server_list:
+        is_due = is_due or self.is_due
+        due_tasks = []
+        for server_url, phases in tasks:
+            server_id = server_url.split('/')[-1]
+            if is_due(server_id):
+                due_tasks.append((server_url, phases))
+                continue
+            
+            # 已停止的服务器即使不需要续期也要启动
+            start_phases = tuple(phase for phase in phases if phase != 'renew')
+            expires_at = (self.server_state.get(server_id) or {}).get('expires_at')
+            self.log(f"⏭️ 服务器 {server_id} 未到续期时间 (到期 {expires_at})，本次跳过续期"
+                     + ("，只检查启动" if start_phases else ""))
+            self.server_results[server_id] = {
+                'renew_status': 'skipped_not_due',
+                'start_status': '未执行' if start_phases else 'skipped_not_due'
+            }
+            if start_phases:
+                due_tasks.append((server_url, start_phases))
+            else:
+                results_by_url[server_url] = f"{server_id}: renew:skipped_not_due,start:skipped_not_due"
+        
+        return due_tasks
+    
+    # ---------- 进度日志 ----------
+    
+    def skip_completed_phases(self, tasks, results_by_url):
+        """跳过进度日志中近期已成功的阶段，中断后重跑时从上次停下的地方继续"""
+        if self.force:
+            return tasks
+        
+        latest = self.journal.latest(self.journal_fresh_hours)
+        remaining = []
+        for server_url, phases in tasks:
+            server_id = server_url.split('/')[-1]
+            done = {
+                phase: entry['status'] for phase, entry in latest.get(server_id, {}).items()
+                if phase in phases and entry['status'] in PHASE_OK_STATUSES[phase]
+            }
+            if not done:
+                remaining.append((server_url, phases))
+                continue
+            
+            status = self.server_results.setdefault(server_id, {'renew_status': '未执行', 'start_status': '未执行'})
+            for phase, phase_status in done.items():
+                status[f'{phase}_status'] = phase_status
+            
+            left = tuple(phase for phase in phases if phase not in done)
+            self.log(f"⏭️ 服务器 {server_id} 近 {self.journal_fresh_hours:g} 小时内已完成: {', '.join(done)}")
+            if left:
+                remaining.append((server_url, left))
+            else:
+                results_by_url[server_url] = f"{server_id}: renew:{status['renew_status']},start:{status['start_status']}"
+        
+        return remaining
+    
+    def compact_journal(self):
+        """压缩进度日志；分片模式下只在父进程启动分片前调用一次，避免与分片的追加写入冲突"""
+        try:
+            self.journal.compact()
+        except OSError as e:
+            self.log(f"压缩进度日志失败: {e}", "WARNING")
+    
+    def load_results_from_journal(self):
+        """从进度日志恢复每个服务器最近一次的结果，用于运行中断后生成 README"""
+        latest = self.journal.latest()
+        self.server_results = {}
+        for server_url in self.server_list:
+            server_id = server_url.split('/')[-1]
+            phases = latest.get(server_id, {})
+            self.server_results[server_id] = {
+                f'{phase}_status': phases[phase]['status'] if phase in phases else '未执行'
+                for phase in PHASES
+            }
+        return [
+            f"{server_id}: renew:{status['renew_status']},start:{status['start_status']}"
+            for server_id, status in self.server_results.items()
+        ]
+    
+    # ---------- HTTP 后端 ----------
+    
+    def create_http_client(self):
+        """用缓存的登录会话或 remember_web cookie 创建面板 HTTP 客户端"""
+        state = self.load_session_state()
+        client = PanelHttpClient.from_storage_state(self.url, state, pool_size=self.concurrency, scheduler=self.scheduler)
+        
+        if self.remember_web_cookie and REMEMBER_COOKIE_NAME not in client.cookies:
+            client.cookies[REMEMBER_COOKIE_NAME] = self.remember_web_cookie
+        
+        return client
+    
+    def http_login_ok(self, client):
+        """通过登录检查接口确认 HTTP 客户端的 cookie 有效"""
+        try:
+            status, _, _ = client.request('GET', urlsplit(self.login_probe_url).path)
+            self.log(f"HTTP 登录检查接口返回: {status}")
+            return status == 200
+        except PanelHttpError as e:
+            self.log(f"HTTP 登录检查失败: {e}", "WARNING")
+            return False
+    
+    def classify_renew_response(self, status, body):
+        """根据续期接口的状态码和响应内容判断结果，无法判断时返回 None
+        
+        2xx 也要求响应内容中有明确的成功信号（新的到期时间或成功提示），HTML 页面和错误 JSON 不算成功
+        """
+        already_patterns = ["already", "only once", "이미", "한번", "불가능"]
+        success_patterns = ["success", "성공", "추가", "added"]
+        text = readable_body(body).lower()
+        
+        if (200 <= status < 300 or status in (400, 409, 422, 429)) and any(p in text for p in already_patterns):
+            return "already_renewed"
+        if not 200 <= status < 300 or text.lstrip().startswith('<'):
+            return None
+        
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and (data.get('errors') or data.get('success') is False):
+            return None
+        
+        if EXPIRY_PATTERN.search(text) or any(p in text for p in success_patterns):
+            return "renew_success"
+        return None
+    
+    def classify_start_response(self, status, body):
+        """根据电源接口的状态码和响应内容判断结果，无法判断时返回 None"""
+        if 200 <= status < 300:
+            return "start_success"
+        if status == 409 and any(p in readable_body(body).lower() for p in ["already", "running"]):
+            return "already_started"
+        return None
+    
+    def http_renew(self, client, server_id):
+        """通过面板接口续期；只有确定请求未被执行时（网络错误、401/403/419）返回 None 以回退到浏览器
+        
+        其他无法判断的响应记为 renew_unknown_changed，不再重复提交，避免重复续期
+        """
+        try:
+            client.ensure_xsrf_token()
+            status, _, body = client.request('POST', self.renew_api.format(server_id=server_id))
+        except PanelHttpError as e:
+            self.log(f"⚠️ 服务器 {server_id} 续期接口请求失败: {e}", "WARNING")
+            return None
+        
+        self.log(f"服务器 {server_id} 续期接口返回: {status}")
+        self.record_expiry(server_id, readable_body(body))
+        result = self.classify_renew_response(status, body)
+        if result or status in (401, 403, 419):
+            return result
+        
+        self.log(f"⚠️ 服务器 {server_id} 续期接口返回 {status}，无法确认结果，不再重复提交", "WARNING")
+        return "renew_unknown_changed"
+    
+    def http_start(self, client, server_id):
+        """通过面板接口发送启动信号，结果无法确定时返回 None 以回退到浏览器"""
+        try:
+            client.ensure_xsrf_token()
+            status, _, body = client.request('POST', self.start_api.format(server_id=server_id), {'signal': 'start'})
+        except PanelHttpError as e:
+            self.log(f"⚠️ 服务器 {server_id} 启动接口请求失败: {e}", "WARNING")
+            return None
+        
+        self.log(f"服务器 {server_id} 启动接口返回: {status}")
+        return self.classify_start_response(status, body)
+    
+    def process_server_http(self, client, server_url, phases=PHASES):
+        """通过面板接口处理单个服务器，返回需要回退到浏览器重做的阶段"""
+        server_id = server_url.split('/')[-1]
+        self.log(f"🔧 [HTTP] 开始处理服务器 {server_id}")
+        
+        if server_id not in self.server_results or set(phases) == set(PHASES):
+            self.server_results[server_id] = {
+                'renew_status': '未执行',
+                'start_status': '未执行'
+            }
+        
+        failed_phases = []
+        actions = {'renew': self.http_renew, 'start': self.http_start}
+        with self.span('server', server_id=server_id):
+            for index, phase in enumerate(phases):
+                with self.span(f'http_{phase}'):
+                    result = actions[phase](client, server_id)
+                if result:
+                    self.set_phase_status(server_id, phase, result)
+                elif phase == 'renew':
+                    # 续期未确认时不先启动，续期和启动都交给浏览器按原顺序重做
+                    failed_phases.extend(phases[index:])
+                    break
+                else:
+                    failed_phases.append(phase)
+        
+        if self.server_results[server_id]['renew_status'] == 'renew_success':
+            self.update_server_state(server_id, last_renew=datetime.now(timezone.utc).isoformat())
+        
+        return tuple(failed_phases)
+    
+    def run_http_backend(self, tasks, results_by_url):
+        """HTTP 后端：先通过接口处理任务中的服务器，返回仍需浏览器处理的 (服务器URL, 阶段) 列表"""
+        self.log("使用 HTTP 后端处理服务器...")
+        client = self.create_http_client()
+        
+        try:
+            if not client.cookies or not self.http_login_ok(client):
+                self.log("HTTP 登录无效，全部回退到浏览器处理", "WARNING")
+                return tasks
+            
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                failed = list(executor.map(lambda task: self.process_server_http(client, *task), tasks))
+        finally:
+            client.close()
+        
+        server_urls = [server_url for server_url, _ in tasks]
+        tasks = []
+        for server_url, failed_phases in zip(server_urls, failed):
+            server_id = server_url.split('/')[-1]
+            if failed_phases:
+                self.log(f"服务器 {server_id} 以下阶段回退到浏览器: {', '.join(failed_phases)}")
+                tasks.append((server_url, failed_phases))
+            else:
+                status = self.server_results[server_id]
+                results_by_url[server_url] = f"{server_id}: renew:{status['renew_status']},start:{status['start_status']}"
+        
+        return tasks
+    
+    def check_config(self):
+        """检查认证信息和服务器列表，有问题时返回错误结果，否则返回 None"""
+        # 检查认证信息
+        has_cookie = self.has_cookie_auth()
+        has_email = self.has_email_auth()
+        
+        self.log(f"Cookie 认证可用: {has_cookie}")
+        self.log(f"邮箱密码认证可用: {has_email}")
+        
+        if not has_cookie and not has_email:
+            self.log("没有可用的认证信息！", "ERROR")
+            return ["error: no_auth"]
+        
+        # 检查服务器URL列表
+        if not self.server_list:
             self.log("未设置服务器URL列表！请设置 WEIRDHOST_SERVER_URLS 环境变量", "ERROR")
             return ["error: no_servers"]
         
@@ -578,129 +1568,595 @@ class WeirdhostAuto:
         for i, server_url in enumerate(self.server_list, 1):
             self.log(f"服务器 {i}: {server_url}")
         
-        results = []
+        return None
+    
+    def run(self, browser_endpoint=None):
+        """主运行函数；指定 browser_endpoint 时连接该浏览器（多账号共用），否则自行启动"""
+        self.log("开始 Weirdhost 自动续期和启动任务")
+        
+        config_error = self.check_config()
+        if config_error:
+            return config_error
+        
+        tasks, results_by_url = self.prepare_tasks()
+        if not tasks:
+            return self.collect_results(results_by_url)
+        
+        return self.run_browser(tasks, results_by_url, browser_endpoint)
+    
+    def prepare_tasks(self):
+        """跳过未到期的服务器，HTTP 后端先处理；返回 (仍需浏览器处理的任务, 已有结果)"""
+        # 每个任务为 (服务器URL, 需要执行的阶段)
+        tasks = [(server_url, PHASES) for server_url in self.server_list]
+        results_by_url = {}
+        
+        # 跳过到期时间充足的服务器，以及上次中断前已成功的阶段
+        tasks = self.filter_due_tasks(tasks, results_by_url)
+        tasks = self.skip_completed_phases(tasks, results_by_url)
+        if not tasks:
+            self.log("✅ 所有服务器都未到续期时间或已处理完成，无需处理")
+            return tasks, results_by_url
+        
+        # HTTP 后端先处理，只有失败的阶段才交给浏览器
+        if self.backend == 'http':
+            with self.span('http_backend'):
+                tasks = self.run_http_backend(tasks, results_by_url)
+            if not tasks:
+                self.log("✅ 所有服务器已通过 HTTP 后端处理完成，无需启动浏览器")
+        
+        return tasks, results_by_url
+    
+    def run_browser(self, tasks, results_by_url, browser_endpoint=None):
+        """用浏览器处理剩余任务，返回全部结果"""
+        # 只有需要浏览器时才导入 Playwright
+        from playwright.sync_api import sync_playwright, TimeoutError
         
         try:
             with sync_playwright() as p:
-                # 启动浏览器，增加一些参数绕过检测
-                browser = p.chromium.launch(
-                    headless=self.headless,
-                    args=[
-                        '--disable-blink-features=AutomationControlled',
-                        '--disable-features=IsolateOrigins,site-per-process',
-                        '--disable-web-security',
-                        '--disable-features=site-per-process'
-                    ]
-                )
-                
-                # 创建浏览器上下文
-                context = browser.new_context(
-                    viewport={'width': 1920, 'height': 1080},
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                )
-                
-                # 创建页面
-                page = context.new_page()
-                page.set_default_timeout(120000)  # 增加超时时间
-                page.set_default_navigation_timeout(120000)
-                
-                login_success = False
+                if browser_endpoint:
+                    with self.span('browser_connect'):
+                        browser = p.chromium.connect_over_cdp(browser_endpoint)
+                    cdp_endpoint = browser_endpoint
+                else:
+                    # 并发模式下工作线程通过 CDP 连接同一个浏览器
+                    browser, cdp_endpoint = self.launch_browser(p, want_cdp=self.concurrency > 1 and len(tasks) > 1)
                 
-                # 方案1: 尝试 Cookie 登录
-                if has_cookie:
-                    if self.login_with_cookies(context):
-                        # 访问任意页面检查登录状态
-                        self.log("检查Cookie登录状态...")
-                        page.goto(self.url, wait_until="domcontentloaded")
-                        
-                        # 处理可能的CF挑战
-                        self.handle_cf_challenge(page, "登录检查")
-                        
-                        if self.check_login_status(page):
-                            self.log("✅ Cookie 登录成功！")
-                            login_success = True
-                        else:
-                            self.log("Cookie 登录失败，cookies 可能已过期", "WARNING")
+                # 创建浏览器上下文和页面，优先载入缓存的登录会话
+                session_state = self.load_session_state()
+                context = self.create_context(browser, storage_state=session_state)
+                page = self.new_page(context)
                 
-                # 方案2: 如果 Cookie 登录失败，尝试邮箱密码登录
-                if not login_success and has_email:
-                    if self.login_with_email(page):
-                        # 登录成功后访问首页
-                        self.log("检查邮箱密码登录状态...")
-                        page.goto(self.url, wait_until="domcontentloaded")
-                        
-                        # 处理可能的CF挑战
-                        self.handle_cf_challenge(page, "登录检查")
-                        
-                        if self.check_login_status(page):
-                            self.log("✅ 邮箱密码登录成功！")
-                            login_success = True
-                
-                # 如果登录成功，依次处理每个服务器
-                if login_success:
-                    for server_url in self.server_list:
-                        result = self.process_server(page, server_url)
-                        results.append(result)
-                        self.log(f"服务器处理结果: {result}")
-                        
-                        # 在处理下一个服务器前等待一下
-                        time.sleep(8)
-                else:
-                    self.log("❌ 所有登录方式都失败了", "ERROR")
-                    results = ["login_failed"] * len(self.server_list)
+                self.process_tasks(context, page, tasks, cdp_endpoint, results_by_url,
+                                   session_cached=session_state is not None)
                 
+                self.sample_rss()
                 browser.close()
-                return results
+                self.log_block_stats()
+                return self.collect_results(results_by_url)
                 
         except TimeoutError as e:
             self.log(f"操作超时: {e}", "ERROR")
-            return ["error: timeout"] * len(self.server_list)
+            return self.fail_unfinished(tasks, results_by_url, "error: timeout")
         except Exception as e:
             self.log(f"运行时出错: {e}", "ERROR")
-            return ["error: runtime"] * len(self.server_list)
+            return self.fail_unfinished(tasks, results_by_url, "error: runtime")
     
-    def write_readme_file(self, results):
-        """写入README文件"""
-        try:
-            # 获取东八区时间
-            beijing_time = datetime.now(timezone(timedelta(hours=8)))
-            timestamp = beijing_time.strftime('%Y-%m-%d %H:%M:%S')
+    def fail_unfinished(self, tasks, results_by_url, error):
+        """浏览器整体出错时只把未完成的阶段标记为出错，已完成的服务器保留结果"""
+        for server_url, phases in self.failed_tasks(tasks):
+            server_id = server_url.split('/')[-1]
+            self.server_results.setdefault(server_id, {'renew_status': '未执行', 'start_status': '未执行'})
+            for phase in phases:
+                self.set_phase_status(server_id, phase, 'error')
+            results_by_url[server_url] = f"{server_id}: {error}"
+        return self.collect_results(results_by_url)
+    
+    def launch_browser(self, p, want_cdp=False):
+        """优先连接常驻浏览器（browser_host.py），不可用时自行启动；返回 (browser, CDP 地址)
+        
+        自行启动且 want_cdp 时开放调试端口，供并发工作线程连接
+        """
+        host_endpoint = find_browser_host()
+        if host_endpoint:
+            try:
+                with self.span('browser_connect'):
+                    browser = p.chromium.connect_over_cdp(host_endpoint)
+                self.log(f"🔌 已连接常驻浏览器: {host_endpoint}")
+                return browser, host_endpoint
+            except Exception as e:
+                self.log(f"连接常驻浏览器失败，改为自行启动: {e}", "WARNING")
+        
+        # 启动浏览器，增加一些参数绕过检测
+        launch_args = [
+            '--disable-blink-features=AutomationControlled',
+            '--disable-features=IsolateOrigins,site-per-process',
+            '--disable-web-security',
+            '--disable-features=site-per-process'
+        ]
+        cdp_endpoint = None
+        if want_cdp:
+            # 调试端口没有任何认证，能连上的人可以完全控制已登录的浏览器，必须只监听本机地址；
+            # 端口在探测后释放再交给浏览器，期间可能被占用，此时连接失败会按浏览器出错处理
+            cdp_port = find_free_port()
+            launch_args.append(f'--remote-debugging-port={cdp_port}')
+            launch_args.append('--remote-debugging-address=127.0.0.1')
+            cdp_endpoint = f"http://127.0.0.1:{cdp_port}"
+        
+        with self.span('browser_launch'):
+            browser = p.chromium.launch(
+                headless=self.headless,
+                args=launch_args
+            )
+        return browser, cdp_endpoint
+    
+    def process_tasks(self, context, page, tasks, cdp_endpoint, results_by_url, session_cached=True):
+        """登录后处理任务列表，结果写入 results_by_url"""
+        login_success = self.login(context, page, session_cached=session_cached)
+        
+        # 如果登录成功，处理每个服务器，失败的阶段再单独重试
+        if login_success:
+            self.process_task_list(context, page, tasks, cdp_endpoint, results_by_url)
+            self.retry_failed_tasks(context, page, tasks, cdp_endpoint, results_by_url)
+        else:
+            self.log("❌ 所有登录方式都失败了", "ERROR")
+            for server_url, _ in tasks:
+                results_by_url[server_url] = "login_failed"
+        
+        return login_success
+    
+    def process_task_list(self, context, page, tasks, cdp_endpoint, results_by_url):
+        """按并发配置处理一组任务"""
+        if cdp_endpoint and self.concurrency > 1 and len(tasks) > 1:
+            self.process_servers_concurrently(tasks, context.storage_state(), cdp_endpoint, results_by_url)
+            return
+        
+        for server_url, phases in tasks:
+            result = self.process_server(page, server_url, phases)
+            results_by_url[server_url] = result
+            self.log(f"服务器处理结果: {result}")
+    
+    def failed_tasks(self, tasks):
+        """找出未成功的阶段，返回只包含这些阶段的任务列表"""
+        failed = []
+        for server_url, phases in tasks:
+            status = self.server_results.get(server_url.split('/')[-1]) or {}
+            failed_phases = tuple(phase for phase in phases
+                                  if status.get(f'{phase}_status') not in PHASE_OK_STATUSES[phase])
+            if failed_phases:
+                failed.append((server_url, failed_phases))
+        return failed
+    
+    def retry_failed_tasks(self, context, page, tasks, cdp_endpoint, results_by_url):
+        """在重试预算内按指数退避重试失败的阶段，已成功的阶段不再重做"""
+        deadline = time.monotonic() + self.retry_budget
+        retry_tasks = self.failed_tasks(tasks)
+        
+        for attempt in range(1, self.retry_attempts + 1):
+            if not retry_tasks:
+                return
+            
+            delay = self.retry_backoff * 2 ** (attempt - 1)
+            if time.monotonic() + delay >= deadline:
+                self.log(f"重试预算 {self.retry_budget:g}s 已用完，{len(retry_tasks)} 个服务器不再重试", "WARNING")
+                return
+            
+            summary = ', '.join(f"{url.split('/')[-1]}({'/'.join(phases)})" for url, phases in retry_tasks)
+            self.log(f"🔁 第 {attempt} 次重试，{delay:g}s 后重做失败的阶段: {summary}")
+            time.sleep(delay)
+            
+            # 页面崩溃或会话失效时先恢复，再重做
+            if page.is_closed():
+                page = self.new_page(context)
+            if not self.login(context, page, session_cached=True):
+                self.log("重试前重新登录失败，放弃重试", "ERROR")
+                return
+            self.process_task_list(context, page, retry_tasks, cdp_endpoint, results_by_url)
+            
+            retry_tasks = self.failed_tasks(retry_tasks)
+        
+        if retry_tasks:
+            self.log(f"⚠️ 重试 {self.retry_attempts} 次后仍有 {len(retry_tasks)} 个服务器失败", "WARNING")
+    
+    # ---------- 常驻模式 ----------
+    
+    def next_run_at(self, server_id):
+        """常驻模式下服务器的下次处理时间：到期前阈值处，且距上次尝试至少间隔重试时间；
+        上次续期已确认时改为至少间隔面板的续期冷却时间，避免续期后到期时间仍在阈值内时反复续期"""
+        state = self.server_state.get(server_id) or {}
+        candidates = []
+        if state.get('expires_at'):
+            expires_at = datetime.fromisoformat(state['expires_at'])
+            candidates.append(expires_at - timedelta(hours=self.renew_before_hours))
+        if state.get('last_attempt'):
+            last_attempt = datetime.fromisoformat(state['last_attempt'])
+            if state.get('renew_status') in ('renew_success', 'already_renewed'):
+                candidates.append(last_attempt + timedelta(hours=self.renew_cooldown_hours))
+            else:
+                candidates.append(last_attempt + timedelta(minutes=self.daemon_retry_minutes))
+        
+        return max(candidates) if candidates else datetime.now(timezone.utc)
+    
+    def reset_timings(self):
+        """常驻模式每轮重新计时，避免计时记录无限增长"""
+        with self._timing_lock:
+            self.timings = []
+            self.run_started = datetime.now(timezone.utc)
+            self._run_started_perf = time.perf_counter()
+    
+    def run_daemon(self, stop_event):
+        """常驻运行：浏览器保持启动和登录，按每个服务器的到期时间定时处理，直到 stop_event 被设置"""
+        self.log("开始 Weirdhost 常驻模式")
+        
+        config_error = self.check_config()
+        if config_error:
+            return config_error
+        
+        all_tasks = [(server_url, PHASES) for server_url in self.server_list]
+        results_by_url = {}
+        
+        if self.metrics_port:
+            serve_metrics(self.metrics, self.metrics_port)
+            self.log(f"📈 指标地址: http://0.0.0.0:{self.metrics_port}/metrics")
+        
+        from playwright.sync_api import sync_playwright
+        
+        with sync_playwright() as p:
+            browser = context = page = None
+            cdp_endpoint = None
+            first_round = True
             
-            # 状态消息映射
-            status_messages = {
-                # 续期状态
-                "renew_success": "✅ 续期成功",
-                "already_renewed": "🔄 已经续期过",
-                "no_renew_button": "❌ 未找到续期按钮",
-                "renew_button_disabled": "❌ 续期按钮不可用(可能被CF屏蔽)",
-                "renew_unknown_changed": "⚠️ 续期页面变化但结果未知",
-                "renew_no_change": "⚠️ 续期页面无变化",
-                "renew_click_error": "💥 点击续期按钮出错",
-                "renew_error": "💥 续期过程出错",
+            while not stop_event.is_set():
+                self.reset_timings()
+                
+                # 第一轮按到期阈值筛选（支持强制模式），之后按每个服务器的下次处理时间
+                if first_round:
+                    tasks = self.filter_due_tasks(all_tasks, results_by_url)
+                    first_round = False
+                else:
+                    now = datetime.now(timezone.utc)
+                    tasks = self.filter_due_tasks(all_tasks, results_by_url,
+                                                  is_due=lambda server_id: self.next_run_at(server_id) <= now)
+                due_tasks = tasks
                 
-                # 启动状态
-                "start_success": "✅ 启动成功",
-                "already_started": "🔄 已经启动",
-                "no_start_button": "❌ 未找到Start按钮",
-                "start_unknown": "⚠️ 启动完成但状态未知",
-                "start_error": "💥 启动过程出错",
+                if tasks and self.backend == 'http':
+                    with self.span('http_backend'):
+                        tasks = self.run_http_backend(tasks, results_by_url)
                 
-                # 通用状态
-                "login_failed": "❌ 登录失败",
-                "error": "💥 运行出错",
-                "未执行": "⏸️ 未执行",
+                if tasks:
+                    try:
+                        # 浏览器只启动一次，断开后才重新启动
+                        if browser is None or not browser.is_connected():
+                            browser, cdp_endpoint = self.launch_browser(
+                                p, want_cdp=self.concurrency > 1 and len(self.server_list) > 1)
+                            session_state = self.load_session_state()
+                            context = self.create_context(browser, storage_state=session_state)
+                            page = self.new_page(context)
+                        
+                        # 已登录时 login 只做一次轻量检查
+                        self.process_tasks(context, page, tasks, cdp_endpoint, results_by_url)
+                    
+                    except Exception as e:
+                        self.log(f"本轮处理出错: {e}", "ERROR")
+                        if browser is not None:
+                            try:
+                                browser.close()
+                            except Exception:
+                                pass
+                        browser = None
                 
-                # 错误状态
-                "error: no_auth": "❌ 无认证信息",
-                "error: no_servers": "❌ 无服务器配置",
-                "error: timeout": "⏰ 操作超时",
-                "error: runtime": "💥 运行时错误"
+                # 本轮尝试过续期的服务器记录尝试时间，失败的在重试间隔后再处理
+                now = datetime.now(timezone.utc).isoformat()
+                for server_url, phases in due_tasks:
+                    if 'renew' in phases:
+                        self.update_server_state(server_url.split('/')[-1], last_attempt=now)
+                
+                if due_tasks:
+                    results = self.collect_results(results_by_url)
+                    self.write_readme_file(results, changed=self.record_history())
+                    self.write_timing_report()
+                    
+                    if browser is not None and browser.is_connected():
+                        self.sample_rss()
+                    round_results = {url.split('/')[-1]: self.server_results[url.split('/')[-1]] for url, _ in due_tasks}
+                    self.update_metrics(round_results)
+                    self.export_metrics()
+                
+                # 休眠到最早需要处理的服务器，最长不超过设定的间隔
+                next_wake = min(self.next_run_at(url.split('/')[-1]) for url, _ in all_tasks)
+                max_wake = datetime.now(timezone.utc) + timedelta(hours=self.daemon_max_sleep_hours)
+                next_wake = min(next_wake, max_wake)
+                sleep_seconds = max((next_wake - datetime.now(timezone.utc)).total_seconds(), 1)
+                self.log(f"💤 下次检查时间: {next_wake.astimezone():%Y-%m-%d %H:%M:%S} ({sleep_seconds / 3600:.1f} 小时后)")
+                stop_event.wait(sleep_seconds)
+            
+            if browser is not None:
+                browser.close()
+        
+        self.log("常驻模式已退出")
+        return self.collect_results(results_by_url)
+    
+    def collect_results(self, results_by_url):
+        """按配置顺序整理结果，未完成的服务器记为出错"""
+        results = []
+        for server_url in self.server_list:
+            server_id = server_url.split('/')[-1]
+            if server_url not in results_by_url:
+                self.server_results[server_id] = {
+                    'renew_status': 'error',
+                    'start_status': 'error'
+                }
+                results_by_url[server_url] = f"{server_id}: error"
+            results.append(results_by_url[server_url])
+        
+        # 保持 README 中服务器的顺序与配置一致
+        self.server_results = {
+            server_url.split('/')[-1]: self.server_results[server_url.split('/')[-1]]
+            for server_url in self.server_list
+        }
+        
+        # 记录本次实际处理的结果，供 status 命令读取
+        run_at = datetime.now(timezone.utc).isoformat()
+        for server_id, status in self.server_results.items():
+            if status['renew_status'] != 'skipped_not_due':
+                self.update_server_state(server_id, last_run=run_at, **status)
+            elif status['start_status'] != 'skipped_not_due':
+                self.update_server_state(server_id, start_status=status['start_status'])
+        self.save_server_state()
+        
+        return results
+    
+    # ---------- 指标 ----------
+    
+    def sample_rss(self):
+        """记录本进程及浏览器的内存峰值，需在浏览器关闭前调用"""
+        total, browser = process_tree_rss(os.getpid())
+        self.peak_rss['total'] = max(self.peak_rss['total'], total)
+        self.peak_rss['browser'] = max(self.peak_rss['browser'], browser)
+    
+    def update_metrics(self, server_results=None):
+        """把本轮的计时、状态、到期时间和内存计入指标"""
+        metrics = self.metrics
+        metrics.observe_spans(self.timings)
+        metrics.count_statuses(self.server_results if server_results is None else server_results)
+        
+        for server_id in self.server_results:
+            expires_at = (self.server_state.get(server_id) or {}).get('expires_at')
+            if expires_at:
+                metrics.set_gauge('weirdhost_server_expiry_timestamp_seconds',
+                                  datetime.fromisoformat(expires_at).timestamp(), {'server': server_id},
+                                  'Known expiry time of each server.')
+        
+        metrics.set_gauge('weirdhost_blocked_requests', self.block_stats['blocked'],
+                          help_text='Requests blocked by the resource filter in the last run.')
+        metrics.set_gauge('weirdhost_blocked_estimated_bytes', self.block_stats['estimated_bytes'],
+                          help_text='Estimated bytes saved by blocking requests in the last run.')
+        
+        metrics.set_gauge('weirdhost_browser_rss_bytes', self.peak_rss['browser'], help_text='Peak RSS of the browser processes.')
+        metrics.set_gauge('weirdhost_process_rss_bytes', self.peak_rss['total'], help_text='Peak RSS of the script and all child processes.')
+        metrics.set_gauge('weirdhost_run_duration_seconds', round(time.perf_counter() - self._run_started_perf, 3),
+                          help_text='Duration of the last run.')
+        metrics.set_gauge('weirdhost_last_run_timestamp_seconds', self.run_started.timestamp(),
+                          help_text='Start time of the last run.')
+    
+    def export_metrics(self):
+        """写入指标 textfile（未配置 WEIRDHOST_METRICS_FILE 时跳过）"""
+        if not self.metrics_file:
+            return
+        try:
+            write_textfile(self.metrics_file, self.metrics.render(openmetrics=self.metrics_format == 'openmetrics'))
+            self.log(f"📈 指标已写入: {self.metrics_file}")
+        except OSError as e:
+            self.log(f"写入指标失败: {e}", "ERROR")
+    
+    # ---------- 状态查看 ----------
+    
+    def format_time(self, value):
+        """ISO 时间转为本地时间显示"""
+        if not value:
+            return '-'
+        return datetime.fromisoformat(value).astimezone().strftime('%Y-%m-%d %H:%M')
+    
+    def print_status(self):
+        """打印配置和上次运行的状态，只读取本地文件，不启动浏览器"""
+        print(f"📋 已配置服务器: {len(self.server_list)}")
+        
+        if os.path.exists(self.session_file):
+            mtime = datetime.fromtimestamp(os.path.getmtime(self.session_file), timezone.utc)
+            print(f"🔑 登录会话缓存: {self.session_file} (更新于 {self.format_time(mtime.isoformat())})")
+        else:
+            print("🔑 登录会话缓存: 无")
+        
+        host_endpoint = find_browser_host()
+        print(f"🌐 常驻浏览器: {host_endpoint or '未运行'}")
+        
+        report = load_json_file(self.timing_file, None)
+        if report:
+            print(f"⏱️ 上次运行: {self.format_time(report.get('started_at'))}，耗时 {report.get('total_seconds')}s")
+        
+        print()
+        print(f"{'服务器ID':<14} {'续期状态':<20} {'启动状态':<20} {'到期时间':<17} {'下次处理':<17} {'续期耗时(近10次)'}")
+        for server_url in self.server_list:
+            server_id = server_url.split('/')[-1]
+            state = self.server_state.get(server_id) or {}
+            renew_msg = STATUS_MESSAGES.get(state.get('renew_status'), state.get('renew_status') or '-')
+            start_msg = STATUS_MESSAGES.get(state.get('start_status'), state.get('start_status') or '-')
+            
+            if self.is_due(server_id):
+                next_run = '下次运行时处理'
+            else:
+                expires_at = datetime.fromisoformat(state['expires_at'])
+                next_run = self.format_time((expires_at - timedelta(hours=self.renew_before_hours)).isoformat())
+            
+            trend = self.history.duration_trend(server_id, 'renew')
+            durations = ' '.join(f"{duration:.2f}" for _, _, duration in trend) or '-'
+            
+            print(f"{server_id:<14} {renew_msg:<20} {start_msg:<20} {self.format_time(state.get('expires_at')):<17} {next_run:<17} {durations}")
+    
+    def create_context(self, browser, storage_state=None):
+        """创建浏览器上下文，可传入已登录的 storage_state 共享认证"""
+        context = browser.new_context(
+            viewport={'width': 1920, 'height': 1080},
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            storage_state=storage_state
+        )
+        
+        if self.block_types or self.block_patterns:
+            context.route("**/*", self.route_request)
+        
+        recorder = self.diagnostics.attach(context)
+        if recorder:
+            self._recorders[context] = recorder
+        
+        return context
+    
+    def should_block(self, resource_type, url):
+        """判断请求是否属于可屏蔽的资源"""
+        if any(pattern in url for pattern in NEVER_BLOCK_PATTERNS):
+            return False
+        return resource_type in self.block_types or any(pattern in url for pattern in self.block_patterns)
+    
+    def route_request(self, route):
+        """请求拦截回调：屏蔽图片、字体、统计和广告等非必要请求"""
+        request = route.request
+        resource_type = request.resource_type
+        
+        if not self.should_block(resource_type, request.url):
+            route.continue_()
+            return
+        
+        with self._block_lock:
+            self.block_stats['blocked'] += 1
+            self.block_stats['estimated_bytes'] += ESTIMATED_RESOURCE_BYTES.get(resource_type, 5 * 1024)
+            by_type = self.block_stats['by_type']
+            by_type[resource_type] = by_type.get(resource_type, 0) + 1
+        
+        route.abort()
+    
+    def log_block_stats(self):
+        """输出本次运行的请求拦截统计"""
+        if not self.block_stats['blocked']:
+            return
+        
+        detail = ', '.join(f"{t}: {n}" for t, n in sorted(self.block_stats['by_type'].items()))
+        saved_kb = self.block_stats['estimated_bytes'] / 1024
+        self.log(f"🚫 请求拦截: 共屏蔽 {self.block_stats['blocked']} 个请求 ({detail})，估算节省约 {saved_kb:.0f} KB")
+    
+    def new_page(self, context):
+        """创建页面并设置超时"""
+        page = context.new_page()
+        page.set_default_timeout(120000)  # 增加超时时间
+        page.set_default_navigation_timeout(120000)
+        return page
+    
+    def process_servers_concurrently(self, tasks, storage_state, cdp_endpoint, results_by_url):
+        """并发处理服务器：每个工作线程通过 CDP 连接同一个已登录的浏览器，使用独立的上下文和页面"""
+        workers = min(self.concurrency, len(tasks))
+        self.log(f"并发模式: {workers} 个工作线程处理 {len(tasks)} 个服务器")
+        
+        from playwright.sync_api import sync_playwright
+        
+        task_queue = queue.Queue()
+        for task in tasks:
+            task_queue.put(task)
+        
+        def worker(worker_id):
+            # Playwright 同步 API 不能跨线程共享，每个线程使用自己的实例
+            try:
+                with sync_playwright() as p:
+                    browser = p.chromium.connect_over_cdp(cdp_endpoint)
+                    context = self.create_context(browser, storage_state=storage_state)
+                    page = self.new_page(context)
+                    try:
+                        while True:
+                            try:
+                                server_url, phases = task_queue.get_nowait()
+                            except queue.Empty:
+                                break
+                            
+                            # 单个服务器出错只记录该服务器，线程继续处理队列中的其他服务器
+                            try:
+                                if page.is_closed():
+                                    page = self.new_page(context)
+                                result = self.process_server(page, server_url, phases)
+                            except Exception as e:
+                                server_id = server_url.split('/')[-1]
+                                self.log(f"[线程{worker_id}] 处理服务器 {server_id} 时出错: {e}", "ERROR")
+                                self.server_results.setdefault(server_id, {'renew_status': '未执行', 'start_status': '未执行'})
+                                for phase in phases:
+                                    self.set_phase_status(server_id, phase, 'error')
+                                result = f"{server_id}: error"
+                            results_by_url[server_url] = result
+                            self.log(f"[线程{worker_id}] 服务器处理结果: {result}")
+                    finally:
+                        context.close()
+            except Exception as e:
+                self.log(f"[线程{worker_id}] 工作线程出错: {e}", "ERROR")
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for worker_id in range(1, workers + 1):
+                executor.submit(worker, worker_id)
+    
+    def record_history(self):
+        """把本次结果写入运行历史，返回服务器的最新状态是否有变化"""
+        server_ids = list(self.server_results)
+        if not server_ids:
+            return True
+        
+        try:
+            before = self.history.latest_statuses(server_ids)
+            
+            report = self.build_timing_report()
+            outcomes = []
+            for server_id, status in self.server_results.items():
+                phases = report['servers'].get(server_id, {}).get('phases', {})
+                for phase in PHASES:
+                    phase_status = status[f'{phase}_status']
+                    # 只记录本次实际计时的阶段，从进度日志恢复或跳过的阶段不记耗时
+                    timed = [phases[key] for key in (f'server/{phase}', f'server/http_{phase}') if key in phases]
+                    duration = round(sum(timed), 3) if timed and phase_status not in PASSIVE_STATUSES else None
+                    outcomes.append((server_id, phase, phase_status, duration))
+            self.history.record_run(self.run_started.isoformat(), report['total_seconds'], outcomes)
+            
+            return self.history.latest_statuses(server_ids) != before
+        except Exception as e:
+            self.log(f"写入运行历史失败: {e}", "WARNING")
+            return True
+    
+    def readme_statuses(self):
+        """README 中展示的状态：优先取运行历史中最近一次实际处理的结果"""
+        try:
+            latest = self.history.latest_statuses(list(self.server_results))
+        except Exception as e:
+            self.log(f"读取运行历史失败: {e}", "WARNING")
+            latest = {}
+        
+        statuses = {}
+        for server_id, status in self.server_results.items():
+            phases = latest.get(server_id, {})
+            statuses[server_id] = {
+                f'{phase}_status': phases.get(phase, status[f'{phase}_status'])
+                for phase in PHASES
             }
+        return statuses
+    
+    def write_readme_file(self, results, changed=True, statuses=None):
+        """写入README文件，避免无变化的提交：changed 为 False 或内容与现有 README 相比只有时间不同时不重写
+        
+        statuses 默认取运行历史中的最新状态
+        """
+        if not changed and os.path.exists('README.md'):
+            self.log("📝 服务器状态无变化，README 保持不变")
+            return
+        
+        try:
+            # 获取东八区时间
+            beijing_time = datetime.now(timezone(timedelta(hours=8)))
+            timestamp = beijing_time.strftime('%Y-%m-%d %H:%M:%S')
             
             # 创建README内容
             readme_content = f"""# 续期执行结果
 
-**最后运行时间**: `{timestamp}` (北京时间)
+**最后状态变化时间**: `{timestamp}` (北京时间)
 
 ## 运行结果
 
@@ -709,9 +2165,11 @@ class WeirdhostAuto:
 """
             
             # 添加每个服务器的结果表格
-            for server_id, status in self.server_results.items():
-                renew_msg = status_messages.get(status['renew_status'], f"❓ {status['renew_status']}")
-                start_msg = status_messages.get(status['start_status'], f"❓ {status['start_status']}")
+            if statuses is None:
+                statuses = self.readme_statuses()
+            for server_id, status in statuses.items():
+                renew_msg = STATUS_MESSAGES.get(status['renew_status'], f"❓ {status['renew_status']}")
+                start_msg = STATUS_MESSAGES.get(status['start_status'], f"❓ {status['start_status']}")
                 readme_content += f"| `{server_id}` | {renew_msg} | {start_msg} |\n"
             
             # 如果没有服务器结果，显示错误信息
@@ -721,18 +2179,18 @@ class WeirdhostAuto:
                         parts = result.split(":", 1)
                         server_id = parts[0].strip()
                         status = parts[1].strip() if len(parts) > 1 else "unknown"
-                        status_msg = status_messages.get(status, f"❓ 未知状态 ({status})")
+                        status_msg = STATUS_MESSAGES.get(status, f"❓ 未知状态 ({status})")
                         readme_content += f"| `{server_id}` | {status_msg} | N/A |\n"
                     else:
-                        status_msg = status_messages.get(result, f"❓ 未知状态 ({result})")
+                        status_msg = STATUS_MESSAGES.get(result, f"❓ 未知状态 ({result})")
                         readme_content += f"| 未知 | {status_msg} | N/A |\n"
             
             # 添加统计信息
             total_servers = len(self.server_list)
-            successful_renews = sum(1 for s in self.server_results.values() 
-                                  if s['renew_status'] in ['renew_success', 'already_renewed'])
-            successful_starts = sum(1 for s in self.server_results.values() 
-                                  if s['start_status'] in ['start_success', 'already_started'])
+            successful_renews = sum(1 for s in statuses.values() 
+                                  if s['renew_status'] in RENEW_OK_STATUSES)
+            successful_starts = sum(1 for s in statuses.values() 
+                                  if s['start_status'] in START_OK_STATUSES)
             
             readme_content += f"""
 ## 统计信息
@@ -740,11 +2198,20 @@ class WeirdhostAuto:
 - 总服务器数: {total_servers}
 - 成功续期: {successful_renews}/{total_servers}
 - 成功启动: {successful_starts}/{total_servers}
-- 运行时间: {timestamp}
+- 更新时间: {timestamp}
 
 
 """
             
+            # 运行历史不可用时（如 CI 中的新环境）以现有 README 为准判断状态是否变化
+            existing = None
+            if os.path.exists('README.md'):
+                with open('README.md', 'r', encoding='utf-8') as f:
+                    existing = f.read()
+            if existing is not None and README_TIMESTAMP.sub('', existing) == README_TIMESTAMP.sub('', readme_content):
+                self.log("📝 服务器状态与现有 README 一致，README 保持不变")
+                return
+            
             # 写入README文件
             with open('README.md', 'w', encoding='utf-8') as f:
                 f.write(readme_content)
@@ -755,13 +2222,69 @@ class WeirdhostAuto:
             self.log(f"写入README文件失败: {e}", "ERROR")
 
 
+def load_json_file(path, default):
+    """读取 JSON 文件，不存在或损坏时返回默认值"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+_FILE_LOCKS = {}
+_FILE_LOCKS_GUARD = threading.Lock()
+
+
+def file_lock(path):
+    """同一进程内按文件路径共用的锁，多个账号实例读写同一个文件时使用"""
+    with _FILE_LOCKS_GUARD:
+        return _FILE_LOCKS.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def save_json_file(path, data):
+    """原子写入 JSON 文件，写入失败只打印警告；每次写入使用独立的临时文件，并发写入不会互相覆盖"""
+    try:
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    except OSError as e:
+        print(f"⚠️ 写入 {path} 失败: {e}")
+
+
+def find_free_port():
+    """获取一个本地空闲端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
 def main():
     """主函数"""
     print("🚀 Weirdhost 自动续期和启动脚本启动 (CF五秒盾修复版)")
     print("=" * 50)
     
+    force = '--force' in sys.argv[1:]
+    
+    # 多账号模式：每个账号的认证信息和服务器列表来自 WEIRDHOST_ACCOUNTS
+    accounts = load_accounts()
+    if accounts:
+        print(f"👥 账号数量: {len(accounts)}")
+        print("=" * 50)
+        auto, results = run_accounts(accounts, force=force)
+        finish(auto, results)
+        return
+    
     # 创建自动操作器
     auto = WeirdhostAuto()
+    if force:
+        auto.force = True
     
     # 检查环境变量
     if not auto.has_cookie_auth() and not auto.has_email_auth():
@@ -783,16 +2306,34 @@ def main():
         print("\n示例: https://hub.weirdhost.xyz/server/abc12345,https://hub.weirdhost.xyz/server/abc67890")
         sys.exit(1)
     
+    # 分片模式：服务器列表拆分到多个进程，每个进程使用自己的浏览器
+    shards = min(max(1, int(os.getenv('WEIRDHOST_SHARDS', '1'))), len(auto.server_list))
+    
     print("🔧 配置检查通过")
     print(f"📋 服务器数量: {len(auto.server_list)}")
+    print(f"🔀 并发数量: {auto.concurrency}")
+    if shards > 1:
+        print(f"🧩 分片进程数: {shards}")
     print("⚠️  注意：此版本已针对CF五秒盾进行优化")
     print("=" * 50)
     
     # 执行自动任务
-    results = auto.run()
-    
-    # 写入README文件
-    auto.write_readme_file(results)
+    auto.compact_journal()
+    if shards > 1:
+        results = run_sharded(auto, shards)
+    else:
+        results = auto.run()
+    finish(auto, results)
+
+
+def finish(auto, results):
+    """写入结果文件、打印汇总并以结果决定退出码"""
+    # 写入README文件和计时报告
+    auto.write_readme_file(results, changed=auto.record_history())
+    auto.write_timing_report()
+    auto.sample_rss()
+    auto.update_metrics()
+    auto.export_metrics()
     
     print("=" * 50)
     print("📊 运行结果汇总:")
@@ -806,9 +2347,9 @@ def main():
     # 统计结果
     total = len(auto.server_list)
     renew_success = sum(1 for s in auto.server_results.values() 
-                       if s['renew_status'] in ['renew_success', 'already_renewed'])
+                       if s['renew_status'] in RENEW_OK_STATUSES)
     start_success = sum(1 for s in auto.server_results.values() 
-                       if s['start_status'] in ['start_success', 'already_started'])
+                       if s['start_status'] in START_OK_STATUSES)
     
     print("\n" + "=" * 50)
     print(f"📈 统计信息:")
@@ -826,5 +2367,219 @@ def main():
         sys.exit(0)
 
 
+def load_accounts():
+    """读取多账号配置：WEIRDHOST_ACCOUNTS_FILE 指定的 JSON 文件或 WEIRDHOST_ACCOUNTS 中的 JSON，未配置返回空列表
+    
+    格式: [{"name": "a", "remember_web_cookie": "...", "email": "...", "password": "...",
+            "server_urls": ["https://hub.weirdhost.xyz/server/xxx"], "concurrency": 2}, ...]
+    """
+    accounts_file = os.getenv('WEIRDHOST_ACCOUNTS_FILE')
+    if accounts_file:
+        with open(accounts_file, 'r', encoding='utf-8') as f:
+            accounts = json.load(f)
+    else:
+        accounts = json.loads(os.getenv('WEIRDHOST_ACCOUNTS') or '[]')
+    
+    for i, account in enumerate(accounts, 1):
+        account.setdefault('name', f"account{i}")
+    return accounts
+
+
+def run_accounts(accounts, force=False):
+    """多账号运行：所有账号共用一个浏览器进程，每个账号一个独立的上下文，账号之间并行处理
+    
+    先为每个账号筛选到期服务器并走 HTTP 后端，仍有任务时才启动浏览器；
+    返回汇总结果的 WeirdhostAuto 实例和结果列表
+    """
+    coordinator = WeirdhostAuto()
+    autos = [WeirdhostAuto(account) for account in accounts]
+    for auto in autos:
+        auto.force = auto.force or force
+        # 所有账号访问同一个面板，共用一个调度器限速
+        auto.scheduler = coordinator.scheduler
+    account_concurrency = max(1, int(os.getenv('WEIRDHOST_ACCOUNT_CONCURRENCY', '2')))
+    coordinator.log(f"多账号模式: {len(autos)} 个账号，同时处理 {account_concurrency} 个账号")
+    
+    def prepare(auto):
+        auto.log("开始 Weirdhost 自动续期和启动任务")
+        auto.compact_journal()
+        config_error = auto.check_config()
+        if config_error:
+            return config_error, None
+        return auto.prepare_tasks()
+    
+    with ThreadPoolExecutor(max_workers=account_concurrency) as executor:
+        prepared = list(executor.map(prepare, autos))
+    
+    account_results = []
+    pending = []
+    for auto, (tasks, results_by_url) in zip(autos, prepared):
+        if results_by_url is None:
+            account_results.append(tasks)  # 配置错误
+        elif not tasks:
+            account_results.append(auto.collect_results(results_by_url))
+        else:
+            account_results.append(None)
+            pending.append((len(account_results) - 1, auto, tasks, results_by_url))
+    
+    if pending:
+        from playwright.sync_api import sync_playwright
+        
+        # 主线程启动共享浏览器并开放 CDP 端口，每个账号线程使用自己的 Playwright 实例连接
+        with sync_playwright() as p:
+            browser, endpoint = coordinator.launch_browser(p, want_cdp=True)
+            with ThreadPoolExecutor(max_workers=account_concurrency) as executor:
+                futures = [
+                    (index, executor.submit(auto.run_browser, tasks, results_by_url, endpoint))
+                    for index, auto, tasks, results_by_url in pending
+                ]
+                for index, future in futures:
+                    account_results[index] = future.result()
+            coordinator.sample_rss()
+            browser.close()
+    
+    # 汇总各账号的结果和计时
+    results = []
+    coordinator.server_list = []
+    coordinator.server_results = {}
+    for auto, account_result in zip(autos, account_results):
+        results.extend(account_result)
+        coordinator.server_list.extend(auto.server_list)
+        coordinator.server_results.update(auto.server_results)
+        coordinator.server_state.update(auto.server_state)
+        coordinator.timings.extend(auto.timings)
+    
+    return coordinator, results
+
+
+def run_shard(index, server_urls, force, shards=1):
+    """分片工作进程：处理分到的服务器，返回 (结果, 服务器结果, 计时记录, 服务器状态, 内存峰值)"""
+    auto = WeirdhostAuto()
+    auto.force = auto.force or force
+    auto.server_list = server_urls
+    auto.log_prefix = f"[分片{index}] "
+    
+    # 各分片进程分摊配置的总速率
+    scheduler = auto.scheduler
+    auto.scheduler = RequestScheduler(scheduler.max_rate / shards, scheduler.burst, scheduler.min_rate / shards,
+                                      scheduler.slow_seconds, log=auto.log)
+    
+    results = auto.run()
+    server_ids = [url.split('/')[-1] for url in server_urls]
+    server_state = {sid: auto.server_state[sid] for sid in server_ids if sid in auto.server_state}
+    return results, auto.server_results, auto.timings, server_state, auto.peak_rss
+
+
+def run_sharded(auto, shards):
+    """按轮询把服务器列表拆分到多个进程，合并各进程的结果到 auto"""
+    shard_lists = [auto.server_list[i::shards] for i in range(shards)]
+    auto.log(f"分片模式: {shards} 个进程，每个进程 {min(map(len, shard_lists))}-{max(map(len, shard_lists))} 个服务器")
+    
+    # spawn 启动的子进程不会继承父进程的线程和 Playwright 状态
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=shards, mp_context=context) as executor:
+        futures = [executor.submit(run_shard, i + 1, urls, auto.force, shards) for i, urls in enumerate(shard_lists)]
+        
+        results_by_url = {}
+        for urls, future in zip(shard_lists, futures):
+            try:
+                results, server_results, timings, server_state, peak_rss = future.result()
+            except Exception as e:
+                auto.log(f"分片进程出错: {e}", "ERROR")
+                results, server_results, timings, server_state, peak_rss = ["error: runtime"] * len(urls), {}, [], {}, {}
+            
+            # 分片在处理服务器前出错（如缺少认证信息）时只返回一条错误，套用到该分片的所有服务器
+            if len(results) != len(urls):
+                results = results[:1] * len(urls) if results else ["error: runtime"] * len(urls)
+            results_by_url.update(zip(urls, results))
+            auto.server_results.update(server_results)
+            auto.timings.extend(timings)
+            auto.server_state.update(server_state)
+            
+            # 各分片的浏览器同时运行，内存峰值相加
+            for key, value in peak_rss.items():
+                auto.peak_rss[key] += value
+    
+    # 各进程都会写状态文件，最后统一用合并后的状态覆盖
+    auto.save_server_state()
+    
+    # 按配置顺序整理，出错的分片中缺少结果的服务器记为出错
+    for server_url in auto.server_list:
+        server_id = server_url.split('/')[-1]
+        auto.server_results.setdefault(server_id, {'renew_status': 'error', 'start_status': 'error'})
+    auto.server_results = {url.split('/')[-1]: auto.server_results[url.split('/')[-1]] for url in auto.server_list}
+    return [results_by_url.get(url, f"{url.split('/')[-1]}: error") for url in auto.server_list]
+
+
+def daemon():
+    """常驻模式入口：python test1.py daemon"""
+    print("🚀 Weirdhost 常驻模式启动")
+    print("=" * 50)
+    
+    auto = WeirdhostAuto()
+    if '--force' in sys.argv[1:]:
+        auto.force = True
+    
+    if not auto.has_cookie_auth() and not auto.has_email_auth():
+        print("❌ 错误：未设置认证信息！请设置 REMEMBER_WEB_COOKIE 或 WEIRDHOST_EMAIL/WEIRDHOST_PASSWORD")
+        sys.exit(1)
+    if not auto.server_list:
+        print("❌ 错误：未设置服务器URL列表！请设置 WEIRDHOST_SERVER_URLS")
+        sys.exit(1)
+    
+    print(f"📋 服务器数量: {len(auto.server_list)}")
+    print(f"⏰ 到期前 {auto.renew_before_hours:g} 小时续期，失败后 {auto.daemon_retry_minutes:g} 分钟重试")
+    print("=" * 50)
+    
+    # 收到 SIGTERM/SIGINT 时结束休眠并退出
+    stop_event = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda signum, frame: stop_event.set())
+    
+    auto.run_daemon(stop_event)
+
+
+def readme():
+    """重新生成 README：python test1.py readme，用于运行超时被终止之后
+    
+    状态与正常运行一致取自各账号的运行历史，历史中没有记录的服务器才使用进度日志中的结果
+    """
+    accounts = load_accounts()
+    autos = [WeirdhostAuto(account) for account in accounts] if accounts else [WeirdhostAuto()]
+    
+    coordinator = autos[0] if len(autos) == 1 else WeirdhostAuto()
+    results = []
+    server_results = {}
+    statuses = {}
+    for auto in autos:
+        results.extend(auto.load_results_from_journal())
+        server_results.update(auto.server_results)
+        statuses.update(auto.readme_statuses())
+    
+    coordinator.server_list = [url for auto in autos for url in auto.server_list]
+    coordinator.server_results = server_results
+    
+    # 只读取运行历史，不写入
+    coordinator.write_readme_file(results, statuses=statuses)
+
+
+def status():
+    """状态查看入口：python test1.py status，不导入 Playwright"""
+    accounts = load_accounts()
+    for account in accounts or [None]:
+        auto = WeirdhostAuto(account)
+        if auto.account_name:
+            print(f"\n👤 账号: {auto.account_name}")
+        auto.print_status()
+
+
 if __name__ == "__main__":
-    main()
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'daemon':
+        daemon()
+    elif command == 'status':
+        status()
+    elif command == 'readme':
+        readme()
+    else:
+        main()
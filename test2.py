@@ -1,16 +1,28 @@
 import os
-import time
+import re
 from datetime import datetime
+from urllib.parse import urlsplit
 from playwright.sync_api import sync_playwright, TimeoutError
+from browser_host import connect_or_launch
+from screenshot_ring import ScreenshotRing
+from panel_http import readable_body
 
 # ========== 配置区 ==========
-SERVER_URLS = [
+PANEL_URL = os.getenv("WEIRDHOST_URL", "https://hub.weirdhost.xyz")
+
+# 可通过 WEIRDHOST_SERVER_URLS（逗号分隔）覆盖
+SERVER_URLS = [u.strip() for u in os.getenv("WEIRDHOST_SERVER_URLS", "").split(",") if u.strip()] or [
     "https://hub.weirdhost.xyz/server/xxxxxxxx"
 ]
 
 REMEMBER_COOKIE = os.getenv("REMEMBER_WEB_COOKIE")
 SCREENSHOT_DIR = "screenshots"
 HEADLESS = True
+
+# 续期接口返回这些提示时表示本周期已续期过
+ALREADY_RENEWED_PATTERNS = ["already", "only once", "이미", "한번", "불가능"]
+# 续期接口响应体中出现这些内容（或新的到期日期）才算续期成功
+RENEW_SUCCESS_PATTERNS = ["success", "성공", "완료", "추가되었습니다", "added"]
 # ===========================
 
 
@@ -18,23 +30,36 @@ def now():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
-def ensure_dir():
-    if not os.path.exists(SCREENSHOT_DIR):
-        os.makedirs(SCREENSHOT_DIR)
+# 截图先放在内存中，服务器失败时才写入 SCREENSHOT_DIR
+SCREENSHOTS = ScreenshotRing(SCREENSHOT_DIR)
 
 
-def screenshot(page, name):
-    path = f"{SCREENSHOT_DIR}/{name}"
-    page.screenshot(path=path, full_page=True)
-    print(f"📸 截图保存: {path}")
+def screenshot(page, key, name):
+    SCREENSHOTS.capture(page, key, name)
 
 
 def wait_cf(page):
     print("⏳ 等待 Cloudflare...")
-    for _ in range(30):
-        if "Checking your browser" not in page.content():
-            return
-        time.sleep(1)
+    try:
+        page.wait_for_function(
+            "() => !document.body || !document.body.innerText.includes('Checking your browser')",
+            timeout=30000
+        )
+    except TimeoutError:
+        print("⚠️ Cloudflare 等待超时")
+
+
+def wait_for_texts(page, texts, timeout):
+    """等待页面出现任一文本，出现即返回 True，超时返回 False"""
+    try:
+        page.wait_for_function(
+            "texts => document.body && texts.some(t => document.body.innerText.includes(t))",
+            arg=texts,
+            timeout=timeout
+        )
+        return True
+    except TimeoutError:
+        return False
 
 
 def inject_cookie(context):
@@ -44,10 +69,10 @@ def inject_cookie(context):
     context.add_cookies([{
         "name": "remember_web",
         "value": REMEMBER_COOKIE,
-        "domain": "hub.weirdhost.xyz",
+        "domain": urlsplit(PANEL_URL).hostname,
         "path": "/",
         "httpOnly": True,
-        "secure": True
+        "secure": urlsplit(PANEL_URL).scheme == "https"
     }])
 
 
@@ -63,7 +88,7 @@ def renew_server(page, url, idx):
     print(f"\n🚀 处理服务器 {idx + 1}")
     page.goto(url, wait_until="domcontentloaded", timeout=60000)
     wait_cf(page)
-    screenshot(page, f"server_{idx}_loaded.png")
+    screenshot(page, idx, f"server_{idx}_loaded.png")
 
     before = get_expire_text(page)
     print(f"📅 续期前到期时间: {before}")
@@ -75,36 +100,60 @@ def renew_server(page, url, idx):
         'text=시간추가'
     ]
 
-    btn = None
-    for sel in renew_selectors:
-        try:
-            btn = page.locator(sel).first
-            if btn.is_visible():
-                break
-        except:
-            pass
-
-    if not btn or not btn.is_visible():
-        screenshot(page, f"server_{idx}_no_button.png")
+    # 合并为一个定位器，任一候选可见即命中，只等待一次
+    btn = page.locator(renew_selectors[0])
+    for sel in renew_selectors[1:]:
+        btn = btn.or_(page.locator(sel))
+    btn = btn.filter(visible=True).first
+
+    try:
+        btn.wait_for(state="visible", timeout=5000)
+    except TimeoutError:
+        screenshot(page, idx, f"server_{idx}_no_button.png")
         print("❌ 未找到续期按钮")
         return "no_button"
 
     print("🖱️ 点击续期按钮")
-    btn.click()
-    page.wait_for_timeout(3000)
 
-    # 判断弹窗成功提示
-    success = False
+    # 捕获面板续期接口的响应，响应到达即可确定结果
+    response = None
+    try:
+        with page.expect_response(
+            lambda r: r.request.method == "POST" and "renew" in r.url,
+            timeout=10000
+        ) as response_info:
+            btn.click()
+        response = response_info.value
+    except TimeoutError:
+        print("⚠️ 未捕获到续期接口响应，改用弹窗提示判断")
+
+    if response is not None:
+        print(f"📨 续期接口响应: {response.status}")
+        screenshot(page, idx, f"server_{idx}_after_click.png")
+        try:
+            body = readable_body(response.text()).lower()
+        except Exception:
+            body = ""
+        if any(p in body for p in ALREADY_RENEWED_PATTERNS):
+            print("🔄 已经续期过")
+            return "already_renewed"
+        if not response.ok:
+            print("❌ 续期请求失败")
+            return "failed"
+        # 2xx 只说明请求被接受，响应体需带有新的到期日期或成功提示，HTML 页面和错误信息不算成功
+        is_page = body.lstrip().startswith("<")
+        has_error = '"errors"' in body or '"success": false' in body
+        if not is_page and not has_error and (
+                re.search(r"\d{4}-\d{2}-\d{2}", body) or any(p in body for p in RENEW_SUCCESS_PATTERNS)):
+            print("🎉 续期成功")
+            return "success"
+        print("⚠️ 续期接口响应中没有成功信息，改用页面判断")
+
+    # 判断弹窗成功提示，出现即返回，最多等待 3 秒
     popup_texts = ["성공", "완료", "추가되었습니다"]
+    success = wait_for_texts(page, popup_texts, timeout=3000)
 
-    for _ in range(10):
-        content = page.content()
-        if any(t in content for t in popup_texts):
-            success = True
-            break
-        time.sleep(1)
-
-    screenshot(page, f"server_{idx}_after_click.png")
+    screenshot(page, idx, f"server_{idx}_after_click.png")
 
     page.reload(wait_until="domcontentloaded")
     wait_cf(page)
@@ -121,11 +170,12 @@ def renew_server(page, url, idx):
 
 
 def main():
-    ensure_dir()
     print(f"🕒 开始执行 WeirdHost Cookie-only 自动续期 | {now()}")
 
     with sync_playwright() as p:
-        browser = p.chromium.launch(
+        # 优先连接常驻浏览器，不可用时自行启动
+        browser, _ = connect_or_launch(
+            p,
             headless=HEADLESS,
             args=[
                 "--disable-blink-features=AutomationControlled",
@@ -139,13 +189,22 @@ def main():
         page = context.new_page()
 
         # ⚠️ 只访问首页，不碰 /login
-        page.goto("https://hub.weirdhost.xyz", wait_until="domcontentloaded", timeout=60000)
+        page.goto(PANEL_URL, wait_until="domcontentloaded", timeout=60000)
         wait_cf(page)
-        screenshot(page, "homepage.png")
+        screenshot(page, "home", "homepage.png")
+
+        SCREENSHOTS.discard("home")
 
         results = {}
-        for i, url in enumerate(SERVER_URLS):
-            results[url] = renew_server(page, url, i)
+        try:
+            for i, url in enumerate(SERVER_URLS):
+                results[url] = renew_server(page, url, i)
+                SCREENSHOTS.finish(i, results[url] not in ("success", "already_renewed"))
+        except Exception:
+            SCREENSHOTS.flush_all()
+            raise
+        finally:
+            SCREENSHOTS.close()
 
         browser.close()
 